@@ -1,4 +1,4 @@
-from modules.discord.data import DriveGuild, fs
+from modules.discord.data import DriveGuild, fs, flush_all
 from modules.discord.client import client
 from modules.paths import sizeof_fmt
 from modules.logs import Log
@@ -23,6 +23,10 @@ R = TypeVar("R")
 def run_async(async_fn: Callable[[Any], Coroutine[Any, Any, R]]) -> R:
     return asyncio.run_coroutine_threadsafe(async_fn, client.loop).result()
 
+async def wait_async(async_fn: Coroutine[Any, Any, R]) -> R:
+    """ Like run_async, but does not block API's event loop (for long operations). """
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(async_fn, client.loop))
+
 def rich_error_response(err_msg: str) -> PlainTextResponse:
     return PlainTextResponse(err_msg, HTTPStatus.CONFLICT)
 
@@ -75,6 +79,13 @@ api.add_middleware(
 )
 
 
+@api.on_event("shutdown")
+def flush_drives() -> None:
+    # Discord client runs in daemon thread, save buffered changes before it is killed.
+    if client.is_ready() and not client.is_closed():
+        run_async(flush_all())
+
+
 @api.get("/api/")
 async def check_status() -> Response:
     return Response(status_code=HTTPStatus.OK)
@@ -230,7 +241,9 @@ async def fetch_structure(instance_id: int, data: schemas.Auth, request: Request
     _, _, drive_manager = response
 
     struct_base_dir = run_async(drive_manager.get_struct())
+    run_async(drive_manager.load_subtree(struct_base_dir))
     struct = struct_base_dir.api_export()
+    struct["version"] = drive_manager.struct_version
     
     return JSONResponse(struct, HTTPStatus.OK)
 
@@ -319,7 +332,7 @@ async def read_file(instance_id: int, data: schemas.Path, request: Request) -> P
     end_path = data.cwd + data.path 
     
     struct_base: fs.FS_Dir = run_async(drive_manager.get_struct())
-    target = struct_base.move_to(end_path)
+    target = run_async(drive_manager.resolve(struct_base, end_path))
     
     if target is None:
         return rich_error_response(errors.INVALID_PATH)
@@ -343,7 +356,7 @@ async def write_file(instance_id: int, data: schemas.Write, request: Request) ->
     end_path = data.cwd + data.path 
     
     struct_base: fs.FS_Dir = run_async(drive_manager.get_struct())
-    target = struct_base.move_to(end_path)
+    target = run_async(drive_manager.resolve(struct_base, end_path))
     
     if target is None:
         return rich_error_response(errors.INVALID_PATH)
@@ -367,19 +380,15 @@ async def upload_file(instance_id: int, data: schemas.Write, request: Request) -
     end_path = data.path 
     
     struct_base: fs.FS_Dir = run_async(drive_manager.get_struct())
-    target_parent = struct_base.move_to(data.cwd)
+    target_parent = run_async(drive_manager.resolve(struct_base, data.cwd))
 
     if target_parent.has_object(data.path):
         return rich_error_response(errors.NAME_IN_USE)
     
-    create_status = run_async(drive_manager.create_file(data.uid, end_path))
+    create_status = run_async(drive_manager.create_file(data.uid, end_path, data.content, True))
     if isinstance(create_status, errors.T_Error):
         return rich_error_response(create_status)
     
-    write_status = run_async(drive_manager.write_file(data.uid, end_path, data.content, True))
-    if isinstance(write_status, errors.T_Error):
-        return rich_error_response(write_status)
-    
     return Response(status_code=HTTPStatus.OK)
 
 
@@ -393,7 +402,7 @@ async def memory_usage(instance_id: int, data: schemas.Auth, request: Request) -
     
     _, _, drive_manager = response
     
-    usage = drive_manager.memory_manager.get_memory_usage()
+    usage = run_async(drive_manager.memory_manager.get_memory_usage())
     total_used = sum(usage.values())
     usage_per_bucket = {}
 
@@ -420,6 +429,7 @@ async def dump_cache(instance_id: int, data: schemas.DebugIndex, request: Reques
     if bucket is None:
         return rich_error_response(f"Bucket of index {index} not found.")
 
+    run_async(bucket.load())
     cache_msg = json.dumps(bucket.cache, indent=2)
     
     return PlainTextResponse(cache_msg, status_code=HTTPStatus.OK)
@@ -430,21 +440,35 @@ async def recache(instance_id: int, data: schemas.DebugIndex, request: Request)
     if not status:
         return response
     
-    _, guild, drive_manager = response
+    _, _, drive_manager = response
     index = data.index
     
     bucket = drive_manager.memory_manager.buckets.get(index)
     if bucket is None:
         return rich_error_response(f"Bucket of index {index} not found.")
 
-    new_cache = run_async(bucket._build_cache(guild, index, bucket.data_channels))
-    bucket.cache = new_cache
-    run_async(bucket._save_cache())
+    if index in drive_manager.memory_manager.rebuild_progress:
+        return rich_error_response(f"Bucket of index {index} is already being recalculated.")
 
-    cache_msg = json.dumps(bucket.cache, indent=2)
+    new_cache = await wait_async(drive_manager.memory_manager.recache(bucket))
+    cache_msg = json.dumps(new_cache, indent=2)
     
     return PlainTextResponse(cache_msg, status_code=HTTPStatus.OK)
 
+@api.post(DEBUG_API + "{instance_id}/recache/progress")
+async def recache_progress(instance_id: int, data: schemas.Auth, request: Request) -> JSONResponse:
+    status, response = await prepare_restricted_endpoint_data(instance_id, data, request)
+    if not status:
+        return response
+    
+    _, _, drive_manager = response
+    progress = {
+        index: {"done": progress.done, "total": progress.total}
+        for index, progress in drive_manager.memory_manager.rebuild_progress.items()
+    }
+
+    return JSONResponse(progress, status_code=HTTPStatus.OK)
+
 @api.post(DEBUG_API + "{instance_id}/trace")
 async def trace_file(instance_id: int, data: schemas.DebugPath, request: Request) -> JSONResponse:
     status, response = await prepare_restricted_endpoint_data(instance_id, data, request)
@@ -454,7 +478,7 @@ async def trace_file(instance_id: int, data: schemas.DebugPath, request: Request
     _, _, drive_manager = response
     
     struct: fs.FS_Dir = run_async(drive_manager.get_struct())
-    file = struct.move_to(data.path)
+    file = run_async(drive_manager.resolve(struct, data.path))
     
     raw_trace: list[Message] = run_async(drive_manager.memory_manager.get_content_trace(file.mem_addr))
     trace = [(msg.id, msg.jump_url) for msg in raw_trace]
@@ -11,11 +11,14 @@ from modules import perms
 
 from discord.ext import commands
 import discord
-import base64
+import asyncio
 import json
 import os
 
 
+RECACHE_PROGRESS_INTERVAL = 3  # Seconds between _recache progress updates.
+
+
 def build_error_message(command: str, description: str = "") -> discord.Embed:
     embed = discord.Embed(
         color=assets.ERROR_COLOR,
@@ -143,6 +146,7 @@ class BotConsoleCommands(commands.Cog):
             await ctx.reply(embed=build_error_message(f"_cache {index}", f"`Bucket {index}` not found."), ephemeral=True)
             return
 
+        await bucket.load()
         cache_msg = json.dumps(bucket.cache, indent=2)
         await ctx.reply(embed=build_output_message(f"_cache {index}", f"`Bucket {index}` cache:\n```json\n{cache_msg}```"), ephemeral=True)
 
@@ -165,12 +169,89 @@ class BotConsoleCommands(commands.Cog):
             await ctx.reply(embed=build_error_message(f"_cache {index}", f"`Bucket {index}` not found."), ephemeral=True)
             return
 
-        new_cache = await bucket._build_cache(ctx.guild, index, bucket.data_channels)
-        bucket.cache = new_cache
-        await bucket._save_cache()
+        if index in manager.memory_manager.rebuild_progress:
+            await ctx.reply(embed=build_error_message(f"_recache {index}", f"`Bucket {index}` is already being recalculated."), ephemeral=True)
+            return
 
-        cache_msg = json.dumps(bucket.cache, indent=2)
-        await ctx.reply(embed=build_output_message(f"_recache {index}", f"Recalculated cache for `Bucket {index}`:\n```json\n{cache_msg}```"), ephemeral=True)
+        recache_task = asyncio.create_task(manager.memory_manager.recache(bucket))
+        reply = await ctx.reply(embed=build_output_message(f"_recache {index}", f"Recalculating cache for `Bucket {index}`..."), ephemeral=True)
+
+        while not recache_task.done():
+            await asyncio.wait({recache_task}, timeout=RECACHE_PROGRESS_INTERVAL)
+            progress = manager.memory_manager.rebuild_progress.get(index)
+            if progress is not None and not recache_task.done():
+                await reply.edit(embed=build_output_message(f"_recache {index}", f"Recalculating cache for `Bucket {index}`: {progress}"))
+
+        cache_msg = json.dumps(recache_task.result(), indent=2)
+        await reply.edit(embed=build_output_message(f"_recache {index}", f"Recalculated cache for `Bucket {index}`:\n```json\n{cache_msg}```"))
+
+    @commands.command(
+        name="_placement",
+        brief="[policy: PolicyName]",
+        help="Displays or sets chunk placement policy of new writes (first-fit, contiguous, striped).",
+        usage="Admin"
+    )
+    async def cmd_placement(self, ctx: commands.Context, policy: str = None) -> None:
+        if not is_console_channel(ctx):
+            return
+
+        manager = await DriveGuild.get(ctx.guild)
+        if not manager.get_permissions(ctx.author).admin:
+            return await ctx.reply(embed=perms.ADMIN_PERMS_ERROR_EMBED)
+
+        policies = ", ".join(f"`{name}`" for name in manager.memory_manager.placements)
+        if policy is None:
+            await ctx.reply(embed=build_output_message("_placement", f"Current policy: `{manager.placement}`\nAvailable: {policies}"), ephemeral=True)
+            return
+
+        status = await manager.set_placement(policy)
+        if isinstance(status, errors.T_Error):
+            await ctx.reply(embed=build_error_message(f"_placement {policy}", f"{status} Available: {policies}"), ephemeral=True)
+            return
+
+        await ctx.reply(embed=build_output_message(f"_placement {policy}", f"Placement policy set to `{policy}`."), ephemeral=True)
+
+    @commands.command(
+        name="_quota",
+        brief="<path: DirPath> [bytes: int | none]",
+        help="Displays or sets max total size of files under directory. Use `none` to remove quota.",
+        usage="Admin"
+    )
+    async def cmd_quota(self, ctx: commands.Context, path: str = None, quota: str = None) -> None:
+        if not is_console_channel(ctx):
+            return
+
+        manager = await DriveGuild.get(ctx.guild)
+        if not manager.get_permissions(ctx.author).admin:
+            return await ctx.reply(embed=perms.ADMIN_PERMS_ERROR_EMBED)
+
+        if path is None:
+            return await ctx.reply(embed=build_error_message("_quota", "Missing `<path>` attribute! (_quota <path> [bytes])"), ephemeral=True)
+
+        if quota is None:
+            cwd, cwd_ok = await manager.get_cwd(ctx.author.id, ctx)
+            if not cwd_ok:
+                return
+
+            target = await manager.resolve(cwd, path)
+            if not isinstance(target, fs.FS_Dir):
+                return await ctx.reply(embed=build_error_message(f"_quota {path}", f"Directory not found: `{path}`"), ephemeral=True)
+
+            limit = "none" if target.quota is None else f"{sizeof_fmt(target.quota)} ({target.quota} B)"
+            return await ctx.reply(embed=build_output_message(f"_quota {path}", f"Quota: `{limit}`\nUsed: `{sizeof_fmt(target.total_size)}`"), ephemeral=True)
+
+        if quota.lower() == "none":
+            value = None
+        elif quota.isdigit():
+            value = int(quota)
+        else:
+            return await ctx.reply(embed=build_error_message(f"_quota {path} {quota}", f"Fail: `{errors.INVALID_QUOTA}`"), ephemeral=True)
+
+        status = await manager.set_quota(ctx.author.id, path, value)
+        if isinstance(status, errors.T_Error):
+            return await ctx.reply(embed=build_error_message(f"_quota {path} {quota}", f"Fail: `{status}`"), ephemeral=True)
+
+        await ctx.reply(embed=build_output_message(f"_quota {path} {quota}", f"Quota of `{path}` set to `{quota}`."), ephemeral=True)
 
     @commands.command(
         name="_trace",
@@ -193,10 +274,8 @@ class BotConsoleCommands(commands.Cog):
         if not cwd_ok:
             return
 
-        for file in cwd.files:
-            if file.name == name:
-                break
-        else:
+        file = cwd.children.get(name)
+        if not isinstance(file, fs.FS_File):
             return await ctx.reply(embed=build_error_message(f"_trace {name}", f"File not found: `{name}`"), ephemeral=True)
 
         trace = await drive_man.memory_manager.get_content_trace(file.mem_addr)
@@ -247,7 +326,7 @@ class BotConsoleCommands(commands.Cog):
     )
     async def cmd_memusage(self, ctx: commands.Context) -> None:
         manager = await DriveGuild.get(ctx.guild)
-        usage_per_bucket = manager.memory_manager.get_memory_usage()
+        usage_per_bucket = await manager.memory_manager.get_memory_usage()
         total_used = sum(usage_per_bucket.values())
 
         message = f"**Used memory**: `{sizeof_fmt(total_used)}`\n\nUsage per bucket:\n"
@@ -259,6 +338,33 @@ class BotConsoleCommands(commands.Cog):
 
         await ctx.reply(embed=build_output_message("usage", message))
 
+    @commands.command(
+        name="du",
+        brief="[path: DirPath]",
+        help="Display total size, files and directories count of directory (CWD by default) and it's subdirectories."
+    )
+    async def cmd_disk_usage(self, ctx: commands.Context, path: str = ".") -> None:
+        if not is_console_channel(ctx):
+            return
+
+        drive_man = await DriveGuild.get(ctx.guild)
+        cwd, cwd_ok = await drive_man.get_cwd(ctx.author.id, ctx)
+        if not cwd_ok:
+            return
+
+        target = await drive_man.resolve(cwd, path)
+        if not isinstance(target, fs.FS_Dir):
+            return await ctx.reply(embed=build_error_message(f"du {path}", f"Directory not found: `{path}`"))
+
+        message = f"**{target.path_to()}**: `{sizeof_fmt(target.total_size)}` ({target.files_count} files, {target.dirs_count} dirs)"
+        if target.quota is not None:
+            message += f"\nQuota: `{sizeof_fmt(target.quota)}`"
+
+        for dir in sorted(target.dirs, key=lambda dir: dir.total_size, reverse=True):
+            message += f"\n* {dir.name}/: `{sizeof_fmt(dir.total_size)}` ({dir.files_count} files, {dir.dirs_count} dirs)"
+
+        await ctx.reply(embed=build_output_message(f"du {path}", message))
+
     @commands.command(
         name="home",
         help="Change CWD to the base directory."
@@ -282,6 +388,7 @@ class BotConsoleCommands(commands.Cog):
 
         drive_man = await DriveGuild.get(ctx.guild)
         target, _ = await drive_man.get_cwd(ctx.author.id, ctx)
+        await drive_man.load_subtree(target)
         await ctx.reply(embed=build_output_message(ctx.invoked_with, f"```asciidoc\n{target.draw_tree()}```"))
 
     @commands.command(
@@ -315,7 +422,7 @@ class BotConsoleCommands(commands.Cog):
         if not cwd_ok:
             return
 
-        target = cwd.move_to(rel_path)
+        target = await drive_man.resolve(cwd, rel_path)
 
         if target is None:
             await ctx.reply(embed=build_error_message(f"cd {rel_path}", f"Target path doesn't exist: `{cwd.path_to()}{rel_path}`"))
@@ -403,7 +510,7 @@ class BotConsoleCommands(commands.Cog):
         cwd, cwd_ok = await drive_man.get_cwd(ctx.author.id, ctx)
         if not cwd_ok:
             return
-        target = cwd.move_to(path)
+        target = await drive_man.resolve(cwd, path)
 
         content_b = await drive_man.get_file_content(ctx.author.id, path)
         if isinstance(content_b, errors.T_Error):
@@ -463,16 +570,12 @@ class BotConsoleCommands(commands.Cog):
 
         for file in files:
             name = file.filename
-            content = base64.b64encode(await file.read()).decode()
+            content = await file.read()
 
-            create_status = await drive_man.create_file(ctx.author.id, name)
+            create_status = await drive_man.create_file(ctx.author.id, name, content)
             if isinstance(create_status, errors.T_Error):
                 return await ctx.reply(embed=build_error_message(f"{ctx.invoked_with}", f"Create-Fail: `{create_status}` ({name})"))
 
-            write_status = await drive_man.write_file(ctx.author.id, name, content, skip_encoding=True)
-            if isinstance(write_status, errors.T_Error):
-                return await ctx.reply(embed=build_error_message(f"{ctx.invoked_with}", f"Write-Fail: `{write_status}` ({name})"))
-
         await ctx.reply(embed=build_output_message(f"{ctx.invoked_with}", f"Uploaded {len(files)} files."))
 
     @commands.command(
@@ -497,7 +600,7 @@ class BotConsoleCommands(commands.Cog):
         if not cwd_ok:
             return
 
-        target = cwd.move_to(path)
+        target = await drive_man.resolve(cwd, path)
 
         content_b = await drive_man.get_file_content(ctx.author.id, path)
         if isinstance(content_b, errors.T_Error):
@@ -21,6 +21,10 @@ class BotEvents(commands.Cog):
         
         if channel.id in (manager.logs_channel.id, manager.struct_channel.id, manager.console_channel.id, manager.logs_channel.category_id):
             return True
+
+        memory_manager = manager.memory_manager
+        if channel.id in (memory_manager.chunk_index.pages.channel.id, memory_manager.chunk_pool.pages.channel.id):
+            return True
         
         for bucket in manager.memory_manager.buckets.values():
             if channel.id == bucket.category.id or channel.category_id == bucket.category.id:
@@ -86,14 +90,26 @@ class BotEvents(commands.Cog):
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message) -> None:
         if message.author.id == self.client.user.id:
+            # Other instance could write files structure (guilds still initializing load it anyway).
+            manager = data.DriveGuild._register.get(message.guild.id) if message.guild is not None else None
+            if isinstance(manager, data.DriveGuild) and message.channel.id == manager.struct_channel.id:
+                manager.check_struct_message(message.id)
             return
         
         manager = await data.DriveGuild.get(message.channel.guild)
         if message.channel.id != manager.console_channel.id:
-            manager.memory_manager._removed_messages.append(message.id)
             await manager.log(f"{message.author.name} sent message at system channel: {message.channel.name} (removed)")
             await message.delete()
     
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent) -> None:
+        manager = data.DriveGuild._register.get(payload.guild_id) if payload.guild_id is not None else None
+        if not isinstance(manager, data.DriveGuild) or payload.channel_id != manager.struct_channel.id:
+            return
+
+        if payload.data.get("content") is not None:
+            manager.check_struct_message(payload.message_id, edited=True)
+
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member) -> None:
         user = accounts.User.get_by_uid(member.id)
@@ -103,15 +119,20 @@ class BotEvents(commands.Cog):
         user.remove_instance(member.guild.id)
     
     @commands.Cog.listener()
-    async def on_message_delete(self, message: discord.Message) -> None:
-        if message.author.id != self.client.user.id:
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent) -> None:
+        # Raw event comes for every deleted message, so client's removals are always consumed.
+        registered = data.DriveGuild._register.get(payload.guild_id) if payload.guild_id is not None else None
+        if isinstance(registered, data.DriveGuild) and payload.message_id in registered.memory_manager._removed_messages:
+            registered.memory_manager._removed_messages.discard(payload.message_id)
+            return
+
+        message = payload.cached_message
+        if message is None or message.author.id != self.client.user.id:
             return
         
         manager = await data.DriveGuild.get(message.channel.guild)
         if message.channel.id == manager.console_channel.id:
             return
-        if message.id in manager.memory_manager._removed_messages:
-            return
         
         await data.panic_guild_error(message.guild, f"Removed client's message: {message.content}")
         
@@ -2,6 +2,7 @@ from modules.discord.data import DriveGuild
 from modules.discord.client import client
 from modules.discord import pointers
 from modules.discord.assets import *
+from modules.filesystem import binary
 from modules.filesystem import fs
 from modules import accounts
 from modules import errors
@@ -196,14 +197,15 @@ async def initialize_guild(guild: discord.Guild) -> None:
     meta_category = await guild.create_category("meta", overwrites=system_category_perms)
     logs_channel = await guild.create_text_channel("_logs", category=meta_category)
     struct_channel = await guild.create_text_channel("_struct", category=meta_category)
+    await guild.create_text_channel("_index", category=meta_category)
+    await guild.create_text_channel("_pool", category=meta_category)
     data0_category = await guild.create_category("data_0", overwrites=system_category_perms)
     await guild.create_text_channel("_cache", category=data0_category)
     await guild.create_text_channel("0", category=data0_category)
     await guild.edit(system_channel=console_channel)
 
     base_struct = fs.FS_Dir("~", None)
-    struct_export = base_struct.export()
-    struct_content = base64.b64encode(struct_export.encode()).decode()
+    struct_content = base64.b64encode(binary.dump_tree(base_struct)).decode()
     await struct_channel.send(struct_content)
 
     db_data = pointers._GuildPointers(
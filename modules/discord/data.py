@@ -2,6 +2,13 @@ from modules.discord.pointers import guilds_ids_db
 from modules.perms import DrivePermissions
 from modules.discord.client import client
 from modules.logs import Log, get_time
+from modules.filesystem import compression
+from modules.filesystem import chunking
+from modules.filesystem import manifest
+from modules.filesystem import journal
+from modules.filesystem import dir_records
+from modules.filesystem import binary
+from modules.filesystem import codecs
 from modules.filesystem import parser
 from modules.filesystem import fs
 from modules import database
@@ -10,7 +17,8 @@ from modules import errors
 
 from dataclasses import dataclass
 from discord.ext import commands
-from collections import deque
+from collections.abc import Callable
+from abc import ABC, abstractmethod
 import discord
 import zipfile
 import asyncio
@@ -23,23 +31,32 @@ import os
 @dataclass
 class SendableFileData:
     name: str
-    content: io.StringIO | io.BytesIO
+    content: io.BytesIO
     is_zip: bool
     
     def to_discord_file(self) -> discord.File:
         return discord.File(self.content, self.name)
 
     def as_json_response(self) -> dict:
+        """ Text files are sent as is, zips and other binary files base64 encoded (is_base64). """
         self.content.seek(0)
         content = self.content.read()
-        
-        if self.is_zip:
+        is_base64 = self.is_zip
+
+        if not is_base64:
+            try:
+                content = content.decode()
+            except UnicodeDecodeError:
+                is_base64 = True
+
+        if is_base64:
             content = base64.b64encode(content).decode()
         
         return {
             "name": self.name,
             "content": content,
-            "is_zip": self.is_zip
+            "is_zip": self.is_zip,
+            "is_base64": is_base64
         }
 
 
@@ -47,6 +64,14 @@ async def panic_guild_error(guild: discord.Guild, reason: str = "") -> None:
     """ Call to leave server. """
     Log.error(f"Panic error at guild: {guild.name}! {reason}")
 
+    # Unsaved caches are lost once guild is left.
+    instance = DriveGuild._register.get(guild.id)
+    if isinstance(instance, DriveGuild):
+        try:
+            await instance.flush()
+        except discord.HTTPException:
+            Log.warn(f"Failed to save pending changes before leaving guild: {guild.name}")
+
     try:
         guild_man = await DriveGuild.get(guild)
         await guild_man.log(f"PANIC ERROR! {reason}")
@@ -57,38 +82,109 @@ async def panic_guild_error(guild: discord.Guild, reason: str = "") -> None:
     await guild.leave()
 
 
+async def flush_all() -> None:
+    """ Save pending changes of all initialized guilds (call on shutdown). """
+    for instance in list(DriveGuild._register.values()):
+        if isinstance(instance, DriveGuild):
+            await instance.flush()
+
+
+def _alloc_size(message: discord.Message) -> int:
+    """
+    Return amount of memory taken by data message (content before `@`).
+    Attachment chunks always take single message slot (limits.MSG_SIZE).
+    """
+    if message.attachments:
+        return limits.MSG_SIZE
+    return len(message.content.split("@")[0])
+
+
+def _data_size(message: discord.Message) -> int:
+    """ Return amount of data stored in data message (attachment's size for attachment chunks). """
+    if message.attachments:
+        return message.attachments[0].size
+    return _alloc_size(message)
+
+
+CACHE_STORED_KEY = "stored"  # Key of stored data sizes in cache message (other keys are channel ids).
+
+
+def _encode_cache(cache: dict[int, int], stored: dict[int, int]) -> str:
+    return base64.b64encode(json.dumps({**cache, CACHE_STORED_KEY: stored}).encode()).decode()
+
+
+def _decode_cache(content: str) -> tuple[dict[int, int], dict[int, int]]:
+    raw_cache = json.loads(base64.b64decode(content).decode())
+    raw_stored = raw_cache.pop(CACHE_STORED_KEY, None)
+    cache = {int(k): v for k, v in raw_cache.items()}
+
+    # Caches saved before stored sizes were tracked count attachments as single slot until rebuilt.
+    if raw_stored is None:
+        return cache, dict(cache)
+    return cache, {int(k): v for k, v in raw_stored.items()}
+
+
+@dataclass
+class _RebuildProgress:
+    """ Progress of bucket cache rebuild (in data channels). """
+    total: int
+    done: int = 0
+
+    def __str__(self) -> str:
+        return f"{self.done}/{self.total} channels"
+
+
 class _DataBucket:
     """
     Represents single data bucket (category) on discord server.
+    In-memory cache is authoritative, changes are saved in batches (see flush).
     """
     @staticmethod
-    async def _build_cache(guild: discord.Guild, index: int, data_channels: dict[int, discord.TextChannel]) -> dict[int, int]:
+    async def _build_cache(guild: discord.Guild,
+                           index: int,
+                           data_channels: dict[int, discord.TextChannel],
+                           semaphore: asyncio.Semaphore | None = None,
+                           progress: _RebuildProgress | None = None
+                           ) -> tuple[dict[int, int], dict[int, int]]:
         """
         Cache format:
             {
                 channel_id: int  <- Total content size in bytes stored per channel.
             }
+        Returns cache and bytes of data stored per channel (attachments by their size, see _data_size).
+        Channels are read concurrently (limited by semaphore), whole history of each is counted.
         """
+        semaphore = semaphore or asyncio.Semaphore(limits.REBUILD_CONCURRENCY)
+        if progress is not None:
+            progress.total = len(data_channels)
 
-        cache = {}
-
-        for data_ch in data_channels.values():
+        async def channel_size(data_ch: discord.TextChannel) -> tuple[int, int]:
             size = 0
+            stored = 0
+            async with semaphore:
+                async for msg in data_ch.history(limit=None):
+                    if msg.author.id != client.user.id:
+                        Log.warn(f"Found junk message on data channel: {data_ch.name} in bucket {index} at guild: {guild.name}: {msg.content}")
+                        continue
 
-            async for msg in data_ch.history(limit=limits.MIN_MSG_PER_CHANNEL):
-                if msg.author.id != client.user.id:
-                    Log.warn(f"Found junk message on data channel: {data_ch.name} in bucket {index} at guild: {guild.name}: {msg.content}")
-                    continue
+                    size += _alloc_size(msg)
+                    stored += _data_size(msg)
 
-                size += len(msg.content.split("@")[0])
+            if progress is not None:
+                progress.done += 1
+            return size, stored
 
-            cache[data_ch.id] = size
+        channels = list(data_channels.values())
+        sizes = await asyncio.gather(*(channel_size(data_ch) for data_ch in channels))
+        cache = {data_ch.id: size for data_ch, (size, _) in zip(channels, sizes)}
+        stored = {data_ch.id: stored for data_ch, (_, stored) in zip(channels, sizes)}
 
         Log.info(f"Built cache for bucket {index} at guild {guild.name}")
-        return cache
+        return cache, stored
 
     @staticmethod
-    async def init(guild: discord.Guild, category: discord.CategoryChannel, index: int) -> "_DataBucket":
+    async def init(guild: discord.Guild, category: discord.CategoryChannel, index: int, semaphore: asyncio.Semaphore | None = None) -> "_DataBucket":
+        """ Map bucket's data channels. Cache is fetched on first use (see load). """
         data_channels = {}
 
         for channel in category.text_channels:
@@ -100,8 +196,7 @@ class _DataBucket:
                 Log.warn(f"Invalid data channel name: {name} in bucket: {index} at guild: {guild.name}")
                 continue
 
-            index = int(name)
-            data_channels[index] = channel
+            data_channels[int(name)] = channel
 
         if not data_channels:
             Log.info(f"No data channels found at bucket {index} at guild {guild.name} (created 0)")
@@ -114,55 +209,12 @@ class _DataBucket:
                 await panic_guild_error(guild, f"Missing/invalid data channel at bucket: {index} ({i} -> {name})")
                 return
 
-        # Fetch meta message and cache.
-        async def fetch_cache_msg() -> tuple[discord.Message, dict[int, int]]:
-            cache_channel = None
-            cache = None
-
-            for channel in category.text_channels:
-                if channel.name == "_cache":
-                    cache_channel = channel
-                    break
-            else:
-                Log.error(f"No _cache channel found in data bucket: {index} at guild: {guild.name}.")
-                Log.info("The _cache meta channel will be created and Bucket will be cached.")
-
-                cache = await _DataBucket._build_cache(guild, index, data_channels)
-                cache_channel = await category.create_text_channel("_cache")
-
-            cache_message = [message async for message in cache_channel.history(limit=1)]
-            cache_message = cache_message[0] if cache_message else None
-
-            if cache_message is None:
-                if cache is None:
-                    cache = await _DataBucket._build_cache(guild, index, data_channels)
-
-                Log.info(f"Cache mesasge not found on meta channel in bucket: {index} at guild: {guild.name}, sending...")
-                cache_content = base64.b64encode(json.dumps(cache or {}).encode()).decode()
-                cache_message = await cache_channel.send(cache_content)
-
-            else:
-                cache_message = await cache_message.fetch()
-                cache_enc = cache_message.content
-                raw_cache = json.loads(base64.b64decode(cache_enc).decode())
-                cache = {int(k): v for k, v in raw_cache.items()}
-
-            if cache_message.author.id != client.user.id:
-                Log.warn(f"Latest message on cache channel at bucket: {index} does not belong to bot at: {guild.name}")
-                await cache_message.delete()
-                return await fetch_cache_msg()
-
-            return (cache_message, cache)
-
-        cache_msg, cache = await fetch_cache_msg()
-
         return _DataBucket(
             guild,
             category,
             index,
             data_channels,
-            cache_msg,
-            cache
+            semaphore
         )
 
     def __init__(self,
@@ -170,26 +222,122 @@ class _DataBucket:
                  category: discord.CategoryChannel,
                  index: int,
                  data_channels: dict[int, discord.TextChannel],
-                 cache_msg: discord.Message,
-                 cache: dict[int, int]
+                 semaphore: asyncio.Semaphore | None = None
                  ):
         self.guild = guild
         self.category = category
         self.index = index
         self.data_channels = data_channels
-        self._cache_msg = cache_msg
+        self._semaphore = semaphore
+        self._cache_msg: discord.Message | None = None
+        self.cache: dict[int, int] | None = None  # None until loaded.
+        self.stored: dict[int, int] = {}  # channel_id -> bytes of data stored (cache counts attachments as single slot).
+        self._load_task: asyncio.Task | None = None
+        self._space: "_FreeSpaceIndex | None" = None
+        self._dirty = False
+        self._flush_task: asyncio.Task | None = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.cache is not None
+
+    async def load(self) -> None:
+        """ Fetch (or build) cache if it's not loaded yet. Channels are added to free space index after it. """
+        if self.is_loaded:
+            return
+
+        # Concurrent first uses wait for the same fetch.
+        if self._load_task is None:
+            self._load_task = asyncio.create_task(self.__load())
+
+        task = self._load_task
+        try:
+            await task
+        finally:
+            if not self.is_loaded and self._load_task is task:
+                self._load_task = None  # Failed, retried on next use.
+
+    async def __load(self) -> None:
+        self._cache_msg, cache, self.stored = await self.__fetch_cache_msg()
         self.cache = cache
+        if self._space is not None:
+            self._space.add_bucket(self)
+
+        Log.info(f"Loaded bucket {self.index} at guild {self.guild.name}")
+
+    async def __fetch_cache_msg(self) -> tuple[discord.Message, dict[int, int], dict[int, int]]:
+        guild, category, index = self.guild, self.category, self.index
+        cache_channel = None
+        cache = None
+        stored = None
+
+        for channel in category.text_channels:
+            if channel.name == "_cache":
+                cache_channel = channel
+                break
+        else:
+            Log.error(f"No _cache channel found in data bucket: {index} at guild: {guild.name}.")
+            Log.info("The _cache meta channel will be created and Bucket will be cached.")
+
+            cache, stored = await _DataBucket._build_cache(guild, index, self.data_channels, self._semaphore)
+            cache_channel = await category.create_text_channel("_cache")
+
+        cache_message = [message async for message in cache_channel.history(limit=1)]
+        cache_message = cache_message[0] if cache_message else None
+
+        if cache_message is None:
+            if cache is None:
+                cache, stored = await _DataBucket._build_cache(guild, index, self.data_channels, self._semaphore)
+
+            Log.info(f"Cache mesasge not found on meta channel in bucket: {index} at guild: {guild.name}, sending...")
+            cache_message = await cache_channel.send(_encode_cache(cache, stored))
+
+        else:
+            cache_message = await cache_message.fetch()
+            cache, stored = _decode_cache(cache_message.content)
+
+        if cache_message.author.id != client.user.id:
+            Log.warn(f"Latest message on cache channel at bucket: {index} does not belong to bot at: {guild.name}")
+            await cache_message.delete()
+            return await self.__fetch_cache_msg()
+
+        return (cache_message, cache, stored)
 
     async def _save_cache(self) -> None:
-        content = base64.b64encode(json.dumps(self.cache).encode()).decode()
+        content = _encode_cache(self.cache, self.stored)
         try:
-            await self._cache_msg.edit(content=content)
+            self._cache_msg = await self._cache_msg.edit(content=content)
         except discord.HTTPException:
             Log.warn(f"Failed to save cache at bucket {self.index} at guild {self.guild.name} - Message edit error.")
-            await self._cache_msg.channel.send(content)
+            self._cache_msg = await self._cache_msg.channel.send(content)
+
+    def _mark_dirty(self) -> None:
+        """ Schedule save of cache changes made in next limits.CACHE_FLUSH_DELAY seconds. """
+        self._dirty = True
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        while self._dirty:
+            await asyncio.sleep(limits.CACHE_FLUSH_DELAY)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """ Save cache now if it has unsaved changes. """
+        if not self._dirty:
+            return
+
+        # Changes made while saving mark cache dirty again, failed save keeps it dirty.
+        self._dirty = False
+        try:
+            await self._save_cache()
+        except discord.HTTPException:
+            self._dirty = True
+            Log.error(f"Failed to save cache at bucket {self.index} at guild {self.guild.name}")
 
-    async def _reduce_cache_size(self, ch_id: int, size: int) -> None:
-        """ Substract size from cache for channel. """
+    async def _reduce_cache_size(self, ch_id: int, size: int, stored: int | None = None) -> None:
+        """ Substract size from cache for channel (and stored bytes of data, same as size by default). """
+        await self.load()
         if ch_id not in self.cache:
             Log.error(f"Failed to subtract {size}b from sizecache for channel {ch_id} at {self.guild.name}")
             return
@@ -198,34 +346,494 @@ class _DataBucket:
         if self.cache[ch_id] < 0:
             self.cache[ch_id] = 0
 
-        await self._save_cache()
+        stored = size if stored is None else stored
+        self.stored[ch_id] = max(self.stored.get(ch_id, 0) - stored, 0)
+
+        if self._space is not None:
+            self._space.update(ch_id)
+
+        self._mark_dirty()
         Log.info(f"Subtracted {size}b from cache for channel {ch_id} at {self.guild.name}")
 
-    async def _increase_cache_size(self, ch_id: int, size: int) -> None:
-        """ Add size to cache for channel. """
-        await self._reduce_cache_size(ch_id, -size)
+    async def _increase_cache_size(self, ch_id: int, size: int, stored: int | None = None) -> None:
+        """ Add size to cache for channel (and stored bytes of data, same as size by default). """
+        await self._reduce_cache_size(ch_id, -size, None if stored is None else -stored)
         Log.info(f"Appended {size}b to cache for channel {ch_id} at {self.guild.name}")
 
-    async def alloc_message(self, msg_size: int) -> discord.Message | None:
+    async def set_cache(self, cache: dict[int, int], stored: dict[int, int]) -> None:
+        """ Replace whole cache and stored sizes (e.g. rebuilt ones) and save them. """
+        await self.load()
+        self.cache = cache
+        self.stored = stored
+        if self._space is not None:
+            self._space.add_bucket(self)
+
+        self._dirty = True
+        await self.flush()
+
+    async def memory_usage(self) -> int:
+        """ Return amount of bytes stored in this bucket (attachments by their size). """
+        await self.load()
+        return sum(self.stored.values())
+
+
+@dataclass
+class _Reservation:
+    channel: discord.TextChannel
+    size: int
+
+
+class _FreeSpaceIndex:
+    """
+    Free space of all data channels kept in segment tree (max free space per range).
+    Channels are ordered by bucket and channel index, so first channel with enough
+    space (old first-fit order) is found in O(log n). Buckets update it on every
+    cache change. Space for allocations in progress is reserved.
+    """
+    SLOTS = limits.MAX_BUCKETS * limits.MAX_CHANNELS_PER_BUCKET
+
+    def __init__(self) -> None:
+        self._leaves = 1 << (self.SLOTS - 1).bit_length()
+        self._tree = [-1] * (2 * self._leaves)  # -1 for slots without channel.
+        self._slots: dict[int, int] = {}  # channel_id -> slot
+        self._channels: dict[int, tuple[_DataBucket, discord.TextChannel]] = {}  # slot -> (bucket, channel)
+        self._reserved: dict[int, int] = {}  # slot -> size
+
+    def add_bucket(self, bucket: _DataBucket) -> None:
+        bucket._space = self
+        for index, channel in bucket.data_channels.items():
+            self.add_channel(bucket, index, channel)
+
+    def add_channel(self, bucket: _DataBucket, index: int, channel: discord.TextChannel) -> None:
+        # Channel out of limits would take slot of other channel (or one past the tree), new chunks aren't placed there.
+        if not (0 <= bucket.index < limits.MAX_BUCKETS and 0 <= index < limits.MAX_CHANNELS_PER_BUCKET):
+            Log.error(f"Data channel {index} at bucket {bucket.index} is out of limits at guild {bucket.guild.name}, it's not used for new data")
+            return
+
+        slot = bucket.index * limits.MAX_CHANNELS_PER_BUCKET + index
+        self._slots[channel.id] = slot
+        self._channels[slot] = (bucket, channel)
+        self.update(channel.id)
+
+    def free_space(self, slot: int) -> int:
+        bucket, channel = self._channels[slot]
+        used = bucket.cache.get(channel.id, 0) + self._reserved.get(slot, 0)
+        return limits.TOTAL_CHANNEL_CONTENT_SIZE - used
+
+    def update(self, channel_id: int) -> None:
+        slot = self._slots.get(channel_id)
+        if slot is None:
+            return
+
+        node = slot + self._leaves
+        self._tree[node] = self.free_space(slot)
+        node //= 2
+        while node:
+            self._tree[node] = max(self._tree[2 * node], self._tree[2 * node + 1])
+            node //= 2
+
+    def find(self, size: int, start: int = 0) -> int | None:
+        """ Return first slot (from start) with at least size of free space. """
+        def descend(node: int, lo: int, hi: int) -> int | None:
+            if hi <= start or self._tree[node] < size:
+                return None
+            if hi - lo == 1:
+                return lo
+
+            mid = (lo + hi) // 2
+            slot = descend(2 * node, lo, mid)
+            if slot is None:
+                slot = descend(2 * node + 1, mid, hi)
+            return slot
+
+        return descend(1, 0, self._leaves)
+
+    def reserve(self, size: int, start: int = 0) -> _Reservation | None:
+        slot = self.find(size, start)
+        if slot is None:
+            return None
+
+        self._reserved[slot] = self._reserved.get(slot, 0) + size
+        channel = self._channels[slot][1]
+        self.update(channel.id)
+        return _Reservation(channel, size)
+
+    def slot_of(self, channel_id: int) -> int | None:
+        return self._slots.get(channel_id)
+
+    def release(self, reservation: _Reservation) -> None:
+        slot = self._slots[reservation.channel.id]
+        self._reserved[slot] -= reservation.size
+        if not self._reserved[slot]:
+            del self._reserved[slot]
+        self.update(reservation.channel.id)
+
+
+class PlacementPolicy(ABC):
+    """ Decides in which data channels new chunks of single write are placed. """
+    id: str = ""
+    use_pool: bool = True  # Pooled messages (placed anywhere) can be reused.
+
+    @abstractmethod
+    def place(self, space: _FreeSpaceIndex, sizes: list[int]) -> list[_Reservation | None]:
+        """ Reserve space for every chunk (None if chunk does not fit in any channel). """
+
+
+class FirstFitPlacement(PlacementPolicy):
+    """ First channel with enough free space. """
+    id = "first-fit"
+
+    def place(self, space: _FreeSpaceIndex, sizes: list[int]) -> list[_Reservation | None]:
+        return [space.reserve(size) for size in sizes]
+
+
+class ContiguousPlacement(PlacementPolicy):
+    """ Chunks next to each other in as few channels as possible (single history window reads). """
+    id = "contiguous"
+    use_pool = False
+
+    def place(self, space: _FreeSpaceIndex, sizes: list[int]) -> list[_Reservation | None]:
+        start = space.find(sum(sizes))
+        if start is None:
+            start = 0
+
+        reservations = []
+        for size in sizes:
+            reservation = space.reserve(size, start) or space.reserve(size)
+            if reservation is not None:
+                start = space.slot_of(reservation.channel.id)
+            reservations.append(reservation)
+
+        return reservations
+
+
+class StripedPlacement(PlacementPolicy):
+    """ Chunks spread round-robin over all channels (parallel reads use different rate limit routes). """
+    id = "striped"
+    use_pool = False
+
+    def __init__(self) -> None:
+        self._next = 0
+
+    def place(self, space: _FreeSpaceIndex, sizes: list[int]) -> list[_Reservation | None]:
+        reservations = []
+        for size in sizes:
+            reservation = space.reserve(size, self._next) or space.reserve(size)
+            if reservation is not None:
+                self._next = space.slot_of(reservation.channel.id) + 1
+            reservations.append(reservation)
+
+        return reservations
+
+
+PLACEMENT_POLICIES = (FirstFitPlacement, ContiguousPlacement, StripedPlacement)
+DEFAULT_PLACEMENT = FirstFitPlacement.id
+
+
+ATTACHMENT_CHUNK_NAME = "chunk.bin"
+INDEX_CHANNEL_NAME = "_index"
+POOL_CHANNEL_NAME = "_pool"
+BLANK_PAGE = "-"
+
+
+async def _find_meta_channel(category: discord.CategoryChannel, name: str) -> discord.TextChannel:
+    """ Return meta channel from category (created if missing). """
+    for channel in category.text_channels:
+        if channel.name == name:
+            return channel
+
+    Log.info(f"No {name} channel found at guild {category.guild.name} (created)")
+    return await category.create_text_channel(name)
+
+
+class _HistoryReader:
+    """
+    Resolves memory addresses using channel history windows.
+    Chunks of one file usually sit next to each other in the same data channel,
+    so single history call returns up to limits.HISTORY_WINDOW of them at once.
+    All fetched messages are remembered for next lookups.
+    """
+    def __init__(self, guild: discord.Guild) -> None:
+        self.guild = guild
+        self.messages: dict[int, discord.Message] = {}
+
+    async def _read_window(self, channel: discord.TextChannel, after_id: int, before_id: int | None = None) -> tuple[int, int]:
+        """ Remember messages from history window. Returns (fetched amount, newest message id). """
+        after = discord.Object(after_id)
+        before = discord.Object(before_id) if before_id is not None else None
+        amount = 0
+        newest = 0
+
+        async for msg in channel.history(limit=limits.HISTORY_WINDOW, after=after, before=before, oldest_first=True):
+            self.messages[msg.id] = msg
+            newest = max(newest, msg.id)
+            amount += 1
+
+        return amount, newest
+
+    async def seek(self, addr: fs.MemoryAddress) -> discord.Message | None:
+        """ Return message at address, reading history window starting at it if not known yet. """
+        message = self.messages.get(addr.message_id)
+        if message is not None:
+            return message
+
+        channel = self.guild.get_channel(addr.channel_id)
+        if channel is None:
+            Log.error(f"Memory error at {self.guild.name}: Invalid channel id: {addr.channel_id}")
+            return None
+
+        await self._read_window(channel, addr.message_id - 1)
+        message = self.messages.get(addr.message_id)
+        if message is None:
+            Log.error(f"Memory error at {self.guild.name}: Invalid message id: {addr.message_id} at channel: {channel.id}")
+
+        return message
+
+    async def _resolve_channel(self, channel: discord.TextChannel, message_ids: list[int]) -> None:
+        pending = sorted(set(message_ids) - self.messages.keys())
+        i = 0
+
+        while i < len(pending):
+            amount, newest = await self._read_window(channel, pending[i] - 1, pending[-1] + 1)
+            if amount < limits.HISTORY_WINDOW:
+                break  # Whole range was covered, rest is missing.
+
+            while i < len(pending) and pending[i] <= newest:
+                i += 1
+
+    async def resolve(self, addresses: list[fs.MemoryAddress]) -> list[discord.Message | None]:
+        """ Resolve all addresses (grouped per channel) with bounded concurrency. Keeps addresses order. """
+        per_channel: dict[int, list[int]] = {}
+        for addr in addresses:
+            per_channel.setdefault(addr.channel_id, []).append(addr.message_id)
+
+        semaphore = asyncio.Semaphore(limits.MAX_FETCH_CONCURRENCY)
+
+        async def resolve_channel(channel_id: int, message_ids: list[int]) -> None:
+            channel = self.guild.get_channel(channel_id)
+            if channel is None:
+                Log.error(f"Memory error at {self.guild.name}: Invalid channel id: {channel_id}")
+                return
+
+            async with semaphore:
+                await self._resolve_channel(channel, message_ids)
+
+        await asyncio.gather(*(resolve_channel(ch_id, ids) for ch_id, ids in per_channel.items()))
+        return [self.messages.get(addr.message_id) for addr in addresses]
+
+
+class _RecordPages:
+    """
+    Key-value records saved in messages (pages) of meta channel.
+    Page format: `key=value,key=value,...` (`-` for blank page).
+    Only changed pages are saved, blank pages are kept for new records.
+    """
+    @staticmethod
+    async def load(channel: discord.TextChannel | None) -> "_RecordPages":
+        pages = _RecordPages(channel)
+        if channel is None:
+            return pages
+
+        async for msg in channel.history(limit=None, oldest_first=True):
+            if msg.author.id != client.user.id:
+                Log.warn(f"Found junk message on meta channel: {channel.name} at guild: {channel.guild.name}: {msg.content}")
+                continue
+
+            page = pages._new_page(msg)
+            if msg.content == BLANK_PAGE:
+                continue
+
+            for entry in msg.content.split(","):
+                key, value = entry.split("=", 1)
+                pages.records[key] = value
+                pages._page_of[key] = page
+                pages._sizes[page] += len(entry) + 1
+
+        return pages
+
+    def __init__(self, channel: discord.TextChannel | None) -> None:
+        self.channel = channel
+        self.records: dict[str, str] = {}
+        self._pages: list[discord.Message | None] = []
+        self._sizes: list[int] = []
+        self._page_of: dict[str, int] = {}
+        self._dirty: set[int] = set()
+
+    def _new_page(self, message: discord.Message | None = None) -> int:
+        self._pages.append(message)
+        self._sizes.append(0)
+        return len(self._pages) - 1
+
+    def __find_page(self, size: int) -> int:
+        for i in range(len(self._pages) - 1, -1, -1):
+            if self._sizes[i] + size <= limits.MSG_SIZE:
+                return i
+        return self._new_page()
+
+    def set(self, key: str, value: str) -> None:
+        if key in self.records:
+            self.pop(key)
+
+        size = len(key) + len(value) + 2
+        page = self.__find_page(size)
+        self.records[key] = value
+        self._page_of[key] = page
+        self._sizes[page] += size
+        self._dirty.add(page)
+
+    def pop(self, key: str) -> str | None:
+        value = self.records.pop(key, None)
+        if value is None:
+            return None
+
+        page = self._page_of.pop(key)
+        self._sizes[page] -= len(key) + len(value) + 2
+        self._dirty.add(page)
+        return value
+
+    def __render(self, page: int) -> str:
+        entries = [f"{key}={value}" for key, value in self.records.items() if self._page_of[key] == page]
+        return ",".join(entries) or BLANK_PAGE
+
+    async def save(self) -> None:
+        if self.channel is None:
+            if self._dirty:
+                Log.warn("Records are not saved - missing meta channel.")
+            return
+
+        for page in sorted(self._dirty):
+            content = self.__render(page)
+            message = self._pages[page]
+
+            try:
+                if message is None:
+                    self._pages[page] = await self.channel.send(content)
+                else:
+                    self._pages[page] = await message.edit(content=content)
+            except discord.HTTPException:
+                Log.error(f"Failed to save records page {page} at channel {self.channel.name} at guild {self.channel.guild.name}")
+                continue
+
+            self._dirty.discard(page)
+
+
+class _ChunkIndex:
+    """
+    Per-guild index of stored chunks: chunk key -> (address, references).
+    References count manifest entries pointing at the chunk (in all files),
+    so identical chunks are stored once and removed with the last reference.
+    Chunks written before the index existed are not indexed (single owner).
+    Index is saved in `_index` meta channel as `key=channel:message:refs`.
+    """
+    @staticmethod
+    async def init(guild: discord.Guild, meta_category: discord.CategoryChannel) -> "_ChunkIndex":
+        channel = await _find_meta_channel(meta_category, INDEX_CHANNEL_NAME)
+        pages = await _RecordPages.load(channel)
+        Log.info(f"Loaded chunk index ({len(pages.records)} chunks) at guild {guild.name}")
+        return _ChunkIndex(pages)
+
+    def __init__(self, pages: _RecordPages) -> None:
+        self.pages = pages
+        self.entries: dict[str, list[int]] = {}  # key -> [channel_id, message_id, refs]
+        self._keys: dict[int, str] = {}  # message_id -> key
+
+        for key, value in pages.records.items():
+            entry = [int(x) for x in value.split(":")]
+            self.entries[key] = entry
+            self._keys[entry[1]] = key
+
+    def __update(self, key: str) -> None:
+        channel_id, message_id, refs = self.entries[key]
+        self.pages.set(key, f"{channel_id}:{message_id}:{refs}")
+
+    def refs(self, message_id: int) -> int:
+        """ Return references of message (0 if it's not indexed). """
+        key = self._keys.get(message_id)
+        return self.entries[key][2] if key is not None else 0
+
+    def acquire(self, key: str) -> fs.MemoryAddress | None:
+        """ Add reference to stored chunk. Returns its address or None if chunk is not stored. """
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        entry[2] += 1
+        self.__update(key)
+        return fs.MemoryAddress(entry[0], entry[1])
+
+    def add(self, key: str, message: discord.Message, refs: int) -> fs.MemoryAddress:
         """
-        Sends blank message that will be edited with content.
+        Index message as chunk with refs references. If the chunk was stored meanwhile (by
+        concurrent write), references are added to stored one and its address is returned
+        (message is a duplicate then and should be freed).
         """
-        for data_ch in self.data_channels.values():
-            ch_id = data_ch.id
-            used_size = self.cache[ch_id]
-            avb_size = limits.TOTAL_CHANNEL_CONTENT_SIZE - used_size
-
-            if msg_size <= avb_size:
-                message = await data_ch.send("⏱️ `waiting for data...`")
-                # self.cache[ch_id] += msg_size
-                # await self._save_cache()
-                return message
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = [message.channel.id, message.id, 0]
+            self._keys[message.id] = key
 
-        return None
+        entry[2] += refs
+        self.__update(key)
+        return fs.MemoryAddress(entry[0], entry[1])
+
+    def release(self, message_id: int) -> int:
+        """ Drop single reference to message. Returns references left (0 for not indexed messages). """
+        key = self._keys.get(message_id)
+        if key is None:
+            return 0
+
+        entry = self.entries[key]
+        entry[2] -= 1
+        if entry[2] > 0:
+            self.__update(key)
+            return entry[2]
+
+        del self.entries[key]
+        del self._keys[message_id]
+        self.pages.pop(key)
+        return 0
+
+    async def save(self) -> None:
+        await self.pages.save()
+
+
+class _ChunkPool:
+    """
+    Freed text chunk messages kept for reuse - allocation edits pooled message
+    instead of sending new one. Pooled messages keep their old content (and size
+    in bucket's cache) until they are reused or trimmed.
+    Pool is saved in `_pool` meta channel as `message=channel:size`.
+    """
+    @staticmethod
+    async def init(guild: discord.Guild, meta_category: discord.CategoryChannel) -> "_ChunkPool":
+        channel = await _find_meta_channel(meta_category, POOL_CHANNEL_NAME)
+        pages = await _RecordPages.load(channel)
+        Log.info(f"Loaded chunk pool ({len(pages.records)} messages) at guild {guild.name}")
+        return _ChunkPool(pages)
+
+    def __init__(self, pages: _RecordPages) -> None:
+        self.pages = pages
+
+    def __len__(self) -> int:
+        return len(self.pages.records)
+
+    def put(self, message: discord.Message) -> None:
+        self.pages.set(str(message.id), f"{message.channel.id}:{_alloc_size(message)}")
+
+    def __pop(self, key: str) -> tuple[int, int, int]:
+        channel_id, size = self.pages.pop(key).split(":")
+        return int(key), int(channel_id), int(size)
+
+    def pop_newest(self) -> tuple[int, int, int]:
+        """ Returns (message id, channel id, size). """
+        return self.__pop(next(reversed(self.pages.records)))
 
-    def memory_usage(self) -> int:
-        """ Return amount of bytes stored in this bucket. """
-        return sum(self.cache.values())
+    def pop_oldest(self) -> tuple[int, int, int]:
+        """ Returns (message id, channel id, size). """
+        return self.__pop(next(iter(self.pages.records)))
+
+    async def save(self) -> None:
+        await self.pages.save()
 
 
 class MemoryManager:
@@ -236,8 +844,13 @@ class MemoryManager:
     containing information about messages sent per bucket's channel.
     """
     @staticmethod
-    async def init(guild: discord.Guild) -> "MemoryManager":
-        buckets = {}
+    async def init(guild: discord.Guild, meta_category: discord.CategoryChannel) -> "MemoryManager":
+        """
+        Only channel maps of buckets are read here, their caches are fetched on first use.
+        Buckets, chunk index and chunk pool are initialized concurrently.
+        """
+        semaphore = asyncio.Semaphore(limits.REBUILD_CONCURRENCY)
+        categories = {}
 
         for category in guild.categories:
             name = category.name.lower()
@@ -249,16 +862,38 @@ class MemoryManager:
                 Log.error(f"Non-numeric index found at data bucket: {name} in guild {guild.name}")
                 continue
 
-            index = int(index)
-            bucket = await _DataBucket.init(guild, category, index)
-            buckets[index] = bucket
+            categories[int(index)] = category
+
+        *loaded, chunk_index, chunk_pool = await asyncio.gather(
+            *(_DataBucket.init(guild, category, index, semaphore) for index, category in categories.items()),
+            _ChunkIndex.init(guild, meta_category),
+            _ChunkPool.init(guild, meta_category)
+        )
 
-        return MemoryManager(guild, buckets)
+        buckets = dict(sorted(zip(categories, loaded)))
+        return MemoryManager(guild, buckets, chunk_index, chunk_pool, semaphore)
 
-    def __init__(self, guild: discord.Guild, buckets: dict[int, _DataBucket]) -> None:
+    def __init__(self,
+                 guild: discord.Guild,
+                 buckets: dict[int, _DataBucket],
+                 chunk_index: _ChunkIndex,
+                 chunk_pool: _ChunkPool,
+                 semaphore: asyncio.Semaphore | None = None
+                 ) -> None:
         self.guild = guild
         self.buckets = buckets
-        self._removed_messages = deque([], 10)
+        self.chunk_index = chunk_index
+        self.chunk_pool = chunk_pool
+        self._semaphore = semaphore or asyncio.Semaphore(limits.REBUILD_CONCURRENCY)
+        self.free_space = _FreeSpaceIndex()
+        self.placements: dict[str, PlacementPolicy] = {policy.id: policy() for policy in PLACEMENT_POLICIES}
+        self._removed_messages: set[int] = set()  # Deleted by client, discarded once delete event arrives.
+        self._trim_task: asyncio.Task | None = None
+        self.rebuild_progress: dict[int, _RebuildProgress] = {}  # bucket index -> progress of running recache
+
+        # Buckets join free space index once loaded.
+        for bucket in buckets.values():
+            bucket._space = self.free_space
 
     def split_content(self, content: str, n=limits.MSG_SIZE) -> list[str]:
         return [content[i:i + n] for i in range(0, len(content), n)]
@@ -282,33 +917,10 @@ class MemoryManager:
         Log.error(f"Passed invalid query arg for find_bucket(): {type(q)} {q}")
         return None
 
-    def get_memory_usage(self) -> dict[int, int]:
-        """ Return total memory used per bucket. Returns INDEX:BYTES """
-        return {i: b.memory_usage() for i, b in self.buckets.items()}
-
-    async def remove_from_cache(self, file: fs.FS_File) -> None:
-        """ Remove file sizes only from cache. """
-        trace = await self.get_content_trace(file.mem_addr)
-        if isinstance(trace, errors.T_Error):
-            Log.error(f"Failed to wipe file: {file.name} from cache: {trace}")
-            return
-        
-        for msg in trace:
-            alloc_size = len(msg.content.split("@")[0])
-            bucket = self.find_bucket(msg)
-            await bucket._reduce_cache_size(msg.channel.id, alloc_size)
-
-    async def cache_sizes(self, file: fs.FS_File) -> None:
-        """ Save file sizes in cache using it's trace. """
-        trace = await self.get_content_trace(file.mem_addr)
-        if isinstance(trace, errors.T_Error):
-            Log.error(f"Failed to save file: {file.name} in cache: {trace}")
-            return
-        
-        for msg in trace:
-            alloc_size = len(msg.content.split("@")[0])
-            bucket = self.find_bucket(msg)
-            await bucket._increase_cache_size(msg.channel.id, alloc_size)
+    async def get_memory_usage(self) -> dict[int, int]:
+        """ Return total memory used per bucket (loads all buckets). Returns INDEX:BYTES """
+        usage = await asyncio.gather(*(bucket.memory_usage() for bucket in self.buckets.values()))
+        return dict(zip(self.buckets, usage))
 
     async def __create_new_data_channel(self) -> discord.TextChannel | errors.T_Error:
         """ Create new data channel at lowest data bucket or create new bucket with a channel. """
@@ -316,12 +928,15 @@ class MemoryManager:
             ch_amount = len(bucket.data_channels)
             if ch_amount < limits.MAX_CHANNELS_PER_BUCKET:
                 new_id = str(ch_amount)
+                await bucket.load()
 
                 Log.info(f"Created new data channel {new_id} at bucket {bucket.index} at guild {self.guild.name}")
                 channel = await bucket.category.create_text_channel(new_id)
                 bucket.data_channels[ch_amount] = channel
                 bucket.cache[channel.id] = 0
-                await bucket._save_cache()
+                bucket.stored[channel.id] = 0
+                self.free_space.add_channel(bucket, ch_amount, channel)
+                bucket._mark_dirty()
                 return channel
 
         if len(self.buckets) >= limits.MAX_BUCKETS:
@@ -330,14 +945,16 @@ class MemoryManager:
 
         next_bucket_id = len(self.buckets)
         
-        admin_role = self.guild.get_role(guilds_ids_db.get(self.guild.id).admin_id)
+        admin_role = self.guild.get_role(guilds_ids_db.get(self.guild.id).admin_role)
         system_category_perms = {
             self.guild.default_role: discord.PermissionOverwrite(view_channel=False),
             admin_role: discord.PermissionOverwrite(view_channel=True, send_messages=False)
         }
         bucket_category = await self.guild.create_category(f"data_{next_bucket_id}", overwrites=system_category_perms)
-        bucket = await _DataBucket.init(self.guild, bucket_category, next_bucket_id)
-        self.buckets[bucket] = bucket
+        bucket = await _DataBucket.init(self.guild, bucket_category, next_bucket_id, self._semaphore)
+        self.buckets[next_bucket_id] = bucket
+        bucket._space = self.free_space
+        await bucket.load()
 
         Log.info(f"Created new bucket {next_bucket_id} for guild {self.guild.name} (data channel needed)")
         return bucket.data_channels[0]
@@ -356,57 +973,389 @@ class MemoryManager:
 
         return message
 
-    async def get_content_trace(self, header_addr: fs.MemoryAddress) -> list[discord.Message] | errors.T_Error:
-        trace = []
+    async def fetch_chunks(self, addresses: list[fs.MemoryAddress], _reader: "_HistoryReader | None" = None) -> list[discord.Message] | errors.T_Error:
+        """ Fetch all messages at once using history windows. Keeps addresses order. """
+        reader = _reader or _HistoryReader(self.guild)
+        messages = await reader.resolve(addresses)
+
+        for addr, msg in zip(addresses, messages):
+            if msg is None:
+                Log.error(f"Broken memory manifest at guild: {self.guild.name} (at: {addr.prepare_mem_addr()})")
+                return errors.INVALID_MEM_ADDR
 
-        addr = header_addr
+        return messages
+
+    async def __follow_chain(self, header: discord.Message, reader: "_HistoryReader") -> list[discord.Message] | errors.T_Error:
+        """ Walk `content@next` linked list starting at header message. """
+        trace = [header]
+
+        _, addr = header.content.split("@")
         while addr != "END":
-            msg = await self.seek_addr(addr)
+            addr = fs.MemoryAddress.from_mem_addr(addr)
+            msg = await reader.seek(addr)
             if msg is None:
                 Log.error(f"Broken memory trace at guild: {self.guild.name} (at: {addr.prepare_mem_addr()})")
                 return errors.INVALID_MEM_ADDR
 
             trace.append(msg)
-
             _, addr = msg.content.split("@")
-            if addr == "END":
-                break
-            ch_id, msg_id = addr.split(":")
-            addr = fs.MemoryAddress(ch_id, msg_id)
 
         return trace
 
-    async def allocate_memory_chunk(self, size: int) -> discord.Message | errors.T_Error:
-        """ Allocate memory for given size. Do not override it with any content. """
+    async def get_file_trace(self, header_addr: fs.MemoryAddress) -> tuple[list[discord.Message], list[discord.Message]] | errors.T_Error:
+        """
+        Return (manifest messages, content messages) of file.
+        Files without manifest (chained content) have blank manifest list.
+        """
+        reader = _HistoryReader(self.guild)
+        header = await reader.seek(header_addr)
+        if header is None:
+            Log.error(f"Broken memory trace at guild: {self.guild.name} (at: {header_addr.prepare_mem_addr()})")
+            return errors.INVALID_MEM_ADDR
+
+        if not manifest.is_manifest(header.content):
+            trace = await self.__follow_chain(header, reader)
+            if isinstance(trace, errors.T_Error):
+                return trace
+            return [], trace
+
+        manifest_msgs = [header]
+        addresses = []
+
+        while True:
+            body, next_addr = manifest_msgs[-1].content.split("@")
+            addresses.extend(manifest.unpack(body))
+            if next_addr == "END":
+                break
+
+            next_addr = fs.MemoryAddress.from_mem_addr(next_addr)
+            msg = await reader.seek(next_addr)
+            if msg is None:
+                Log.error(f"Broken memory manifest at guild: {self.guild.name} (at: {next_addr.prepare_mem_addr()})")
+                return errors.INVALID_MEM_ADDR
+
+            manifest_msgs.append(msg)
+
+        content_msgs = await self.fetch_chunks(addresses, reader)
+        if isinstance(content_msgs, errors.T_Error):
+            return content_msgs
+
+        return manifest_msgs, content_msgs
+
+    async def get_content_trace(self, header_addr: fs.MemoryAddress) -> list[discord.Message] | errors.T_Error:
+        trace = await self.get_file_trace(header_addr)
+        if isinstance(trace, errors.T_Error):
+            return trace
+
+        return trace[1]
+
+    async def __alloc_from_pool(self, size: int, content: str) -> discord.Message | None:
+        """ Edit pooled message with content. Returns None if no pooled message fits. """
+        skipped = []
+        message = None
+
+        while len(self.chunk_pool) and message is None:
+            message_id, channel_id, old_size = self.chunk_pool.pop_newest()
+            channel = self.guild.get_channel(channel_id)
+            bucket = self.find_bucket(channel) if channel is not None else None
+            if bucket is None:
+                Log.warn(f"Dropped pooled message {message_id} at guild {self.guild.name} (channel not found)")
+                continue
+
+            await bucket.load()
+            if bucket.cache[channel_id] - old_size + size > limits.TOTAL_CHANNEL_CONTENT_SIZE:
+                skipped.append((message_id, channel_id, old_size))
+                continue
+
+            try:
+                message = await channel.get_partial_message(message_id).edit(content=content)
+            except discord.NotFound:
+                Log.warn(f"Dropped pooled message {message_id} at guild {self.guild.name} (message not found)")
+                await bucket._reduce_cache_size(channel_id, old_size)
+                continue
+            except discord.HTTPException:
+                Log.warn(f"Failed to reuse pooled message {message_id} at guild {self.guild.name}")
+                skipped.append((message_id, channel_id, old_size))
+                continue
+
+            await bucket._increase_cache_size(channel_id, _alloc_size(message) - old_size)
+
+        for message_id, channel_id, old_size in skipped:
+            self.chunk_pool.pages.set(str(message_id), f"{channel_id}:{old_size}")
+
+        return message
+
+    async def reserve_memory(self, size: int) -> _Reservation | errors.T_Error:
+        """
+        Reserve space for chunk in first channel that fits it (new data channel is created if needed).
+        Buckets are loaded in order until found channel is before every bucket left to load.
+        """
         for bucket in self.buckets.values():
-            message_holder = await bucket.alloc_message(size)
-            if message_holder is not None:
-                return message_holder
+            slot = self.free_space.find(size)
+            if slot is not None and slot < bucket.index * limits.MAX_CHANNELS_PER_BUCKET:
+                break
+
+            if not bucket.is_loaded:
+                await bucket.load()
+
+        reservation = self.free_space.reserve(size)
+        if reservation is not None:
+            return reservation
 
         channel = await self.__create_new_data_channel()
         if isinstance(channel, errors.T_Error):
             Log.error(f"Failed to allocate memory chunk of size {size}b at guild {self.guild.name}")
+            return channel
 
-        return await self.allocate_memory_chunk(size)
+        return self.free_space.reserve(size)
+
+    async def allocate_memory_chunk(self, size: int, content: str, file: discord.File | None = None, reservation: _Reservation | None = None) -> discord.Message | errors.T_Error:
+        """
+        Allocate memory for given size and send chunk with its final content to reserved space.
+        Without reservation pooled messages are reused first (or space is reserved now).
+        """
+        if file is None and reservation is None:
+            message = await self.__alloc_from_pool(size, content)
+            if message is not None:
+                return message
+
+        if reservation is None:
+            reservation = await self.reserve_memory(size)
+            if isinstance(reservation, errors.T_Error):
+                return reservation
+
+        try:
+            message = await reservation.channel.send(content, file=file)
+        except discord.HTTPException as exc:
+            Log.error(f"Failed to send memory chunk to channel {reservation.channel.id} at guild {self.guild.name}: {exc}")
+            return errors.SEND_FAILED
+        finally:
+            self.free_space.release(reservation)
 
-    async def deallocate_message(self, message: discord.Message) -> None:
-        """ Remove message and reduce bucket's cache. """
         bucket = self.find_bucket(message)
-        content_size = len(message.content.split("@")[0])
-        self._removed_messages.append(message.id)
-        await bucket._reduce_cache_size(message.channel.id, content_size)
+        await bucket._increase_cache_size(message.channel.id, _alloc_size(message), _data_size(message))
+        return message
+
+    async def _free_message(self, message: discord.Message) -> None:
+        """ Put text message into chunk pool, remove attachment message (and reduce bucket's cache). """
+        if not message.attachments:
+            self.chunk_pool.put(message)
+            if len(self.chunk_pool) > limits.CHUNK_POOL_SIZE and (self._trim_task is None or self._trim_task.done()):
+                self._trim_task = asyncio.create_task(self.trim_pool())
+            return
+
+        bucket = self.find_bucket(message)
+        self._removed_messages.add(message.id)
+        await bucket._reduce_cache_size(message.channel.id, _alloc_size(message), _data_size(message))
         await message.delete()
 
+    async def trim_pool(self, size: int = limits.CHUNK_POOL_SIZE // 2) -> None:
+        """ Remove oldest pooled messages, leaving up to size of them. """
+        trimmed = 0
+        while len(self.chunk_pool) > size:
+            message_id, channel_id, old_size = self.chunk_pool.pop_oldest()
+            channel = self.guild.get_channel(channel_id)
+            bucket = self.find_bucket(channel) if channel is not None else None
+            if bucket is None:
+                continue
+
+            self._removed_messages.add(message_id)
+            try:
+                await channel.get_partial_message(message_id).delete()
+            except discord.NotFound:
+                self._removed_messages.discard(message_id)
+                Log.warn(f"Pooled message {message_id} not found at guild {self.guild.name}")
+
+            await bucket._reduce_cache_size(channel_id, old_size)
+            trimmed += 1
+
+        await self.chunk_pool.save()
+        Log.info(f"Trimmed {trimmed} pooled messages at guild {self.guild.name}")
+
+    async def recache(self, bucket: _DataBucket) -> dict[int, int]:
+        """ Rebuild and save bucket's cache. Progress is available in rebuild_progress meanwhile. """
+        progress = _RebuildProgress(len(bucket.data_channels))
+        self.rebuild_progress[bucket.index] = progress
+
+        try:
+            cache, stored = await bucket._build_cache(self.guild, bucket.index, bucket.data_channels, self._semaphore, progress)
+            await bucket.set_cache(cache, stored)
+        finally:
+            self.rebuild_progress.pop(bucket.index, None)
+
+        return bucket.cache
+
+    async def flush(self) -> None:
+        """ Save pending cache changes of all buckets. """
+        for bucket in self.buckets.values():
+            await bucket.flush()
+
+    async def save_meta(self) -> None:
+        """ Save chunk index and chunk pool changes. """
+        await self.chunk_index.save()
+        await self.chunk_pool.save()
+
+    async def deallocate_message(self, message: discord.Message) -> None:
+        """ Drop reference to message. Message is removed when no file references it anymore. """
+        if self.chunk_index.release(message.id) > 0:
+            return
+
+        await self._free_message(message)
+
+    async def store_chunks(self,
+                           codec_id: str,
+                           pieces: list[bytes],
+                           placement: str = DEFAULT_PLACEMENT
+                           ) -> list[fs.MemoryAddress] | errors.T_Error:
+        """
+        Store file's chunks and return their addresses (referenced once per chunk).
+        New chunks are placed according to placement policy, chunks already stored on
+        the drive are only referenced. Stored messages are never changed, so replaced
+        content stays readable until its messages are released (see release_messages).
+        """
+        keys = [chunking.chunk_key(codec_id, piece) for piece in pieces]
+        addresses: dict[str, fs.MemoryAddress] = {}
+        acquired: list[fs.MemoryAddress] = []
+        missing: dict[str, bytes] = {}
+
+        for key, piece in zip(keys, pieces):
+            addr = self.chunk_index.acquire(key)
+            if addr is not None:
+                addresses[key] = addr
+                acquired.append(addr)
+            else:
+                missing[key] = piece
+
+        codec = codecs.get_codec(codec_id)
+        contents: dict[str, str] = {}
+        if codec is not None:
+            contents = {key: codec.encode(piece) + "@END" for key, piece in missing.items()}
+
+        async def rollback() -> None:
+            for reservation in reservations:
+                if reservation is not None:
+                    self.free_space.release(reservation)
+            for msg in sent.values():
+                await self._free_message(msg)
+            for addr in acquired:
+                self.chunk_index.release(addr.message_id)
+            await self.save_meta()
+
+        # Reserve space for whole write (pooled messages are used first if policy allows).
+        policy = self.placements[placement]
+        new_keys = list(missing)
+        pooled = min(len(self.chunk_pool), len(new_keys)) if codec is not None and policy.use_pool else 0
+        sizes = [limits.MSG_SIZE if codec is None else len(contents[key]) for key in new_keys[pooled:]]
+        reservations: list[_Reservation | None] = [None] * pooled + policy.place(self.free_space, sizes)
+        sent: dict[str, discord.Message] = {}
+
+        for i in range(pooled, len(reservations)):
+            if reservations[i] is None:
+                reservation = await self.reserve_memory(sizes[i - pooled])
+                if isinstance(reservation, errors.T_Error):
+                    await rollback()
+                    return reservation
+                reservations[i] = reservation
+
+        for i, key in enumerate(new_keys):
+            reservation, reservations[i] = reservations[i], None
+            if codec is None:
+                file = discord.File(io.BytesIO(missing[key]), ATTACHMENT_CHUNK_NAME)
+                message = await self.allocate_memory_chunk(limits.MSG_SIZE, "@END", file, reservation)
+            else:
+                message = await self.allocate_memory_chunk(len(contents[key]), contents[key], reservation=reservation)
+
+            if isinstance(message, errors.T_Error):
+                await rollback()
+                return message
+            sent[key] = message
+
+        for key, msg in sent.items():
+            addresses[key] = self.chunk_index.add(key, msg, keys.count(key))
+
+        # Chunks stored meanwhile by concurrent writes are referenced, own copies are freed.
+        for key, msg in sent.items():
+            if addresses[key].message_id != msg.id:
+                await self._free_message(msg)
+
+        await self.save_meta()
+        return [addresses[key] for key in keys]
+
+    async def read_attachments(self, messages: list[discord.Message]) -> bytes | errors.T_Error:
+        """ Download raw content of attachment chunks (bounded concurrency). """
+        semaphore = asyncio.Semaphore(limits.MAX_FETCH_CONCURRENCY)
+
+        async def read(message: discord.Message) -> bytes | None:
+            if not message.attachments:
+                Log.error(f"Memory error at {self.guild.name}: Missing attachment at chunk: {message.id}")
+                return None
+
+            async with semaphore:
+                try:
+                    return await message.attachments[0].read()
+                except discord.HTTPException:
+                    Log.error(f"Memory error at {self.guild.name}: Failed to download attachment at chunk: {message.id}")
+                    return None
+
+        parts = await asyncio.gather(*(read(message) for message in messages))
+        if None in parts:
+            return errors.BROKEN_MEMORY
+
+        return b"".join(parts)
+
+    async def write_manifest(self, addresses: list[fs.MemoryAddress]) -> discord.Message | errors.T_Error:
+        """
+        Save chunks addresses in manifest messages. Returns manifest's header message.
+        Pages are written from the last one, so new pages are sent once with their
+        final next pointer and the header is linked last.
+        """
+        bodies = manifest.pack(addresses)
+        pages: list[discord.Message] = [None] * len(bodies)
+        next_addr = "END"
+
+        for i in range(len(bodies) - 1, -1, -1):
+            msg = await self.allocate_memory_chunk(len(bodies[i]), f"{bodies[i]}@{next_addr}")
+            if isinstance(msg, errors.T_Error):
+                for sent in pages[i + 1:]:
+                    await self._free_message(sent)
+                await self.save_meta()
+                return msg
+
+            pages[i] = msg
+            next_addr = fs.MemoryAddress.from_message(msg).prepare_mem_addr()
+
+        await self.save_meta()
+        return pages[0]
+
     async def wipe_file(self, file: fs.FS_File) -> None:
         """ Deallocate all file's memory chunks. """
-        content_trace = await self.get_content_trace(file.mem_addr)
+        trace = await self.get_file_trace(file.mem_addr)
 
-        if isinstance(content_trace, errors.T_Error):
+        if isinstance(trace, errors.T_Error):
             Log.warn(f"Broken memory trace for deleted file: {file.path_to()}")
             return
 
-        for content_msg in content_trace:
-            await self.deallocate_message(content_msg)
+        manifest_msgs, content_msgs = trace
+        await self.release_messages(manifest_msgs + content_msgs)
+
+    async def release_chunks(self, addresses: list[fs.MemoryAddress]) -> None:
+        """ Drop references to chunks returned by store_chunks (chunks left without references are freed). """
+        for addr in addresses:
+            if self.chunk_index.release(addr.message_id) > 0:
+                continue
+
+            message = await self.seek_addr(addr)
+            if message is not None:
+                await self._free_message(message)
+
+        await self.save_meta()
+
+    async def release_messages(self, messages: list[discord.Message]) -> None:
+        """ Drop references to file's manifest and chunk messages (see deallocate_message). """
+        for msg in messages:
+            await self.deallocate_message(msg)
+
+        await self.save_meta()
 
     async def wipe_dir(self, dir: fs.FS_Dir) -> None:
         """ Remove dir and deallocate all files and subdirs. """
@@ -423,6 +1372,333 @@ class MemoryManager:
 T_OpStatus = bool | errors.T_Error  # True or error message (str)
 
 
+class _StructStore:
+    """
+    Files structure saved in struct channel. Every directory has its own record
+    (see filesystem.dir_records), so directories are read only when used (see resolve).
+    Mutations are saved as journal messages (see filesystem.journal) following
+    checkpoint marker, which points to root's record. After limits.STRUCT_JOURNAL_SIZE
+    journal messages, records of changed directories (and their parents up to root)
+    are written again, new marker is sent and replaced messages are removed.
+    Message formats:
+        R:next:data         record page (next = id of next page or END, data = base32768 encoded record)
+        C:record            checkpoint marker
+        J:records           journal message
+        data                legacy tree (single base64 encoded text or binary tree)
+    """
+    RECORD = "R"
+    CHECKPOINT = "C"
+    JOURNAL = "J"
+    END = "END"
+    HEADER_SIZE = 24  # Max length of record page header.
+
+    @staticmethod
+    async def load(channel: discord.TextChannel, removed_messages: set[int]) -> tuple["_StructStore", fs.FS_Dir] | errors.T_Error:
+        """ Read messages from newest to the latest checkpoint, then replay journal on it. """
+        journal_msgs: list[discord.Message] = []
+        stale: list[discord.Message] = []
+        checkpoint = None
+
+        async for msg in channel.history(limit=None):
+            if msg.author.id != client.user.id:
+                Log.warn(f"Found junk message on struct channel at guild: {channel.guild.name}: {msg.content}")
+                continue
+
+            kind, _, body = msg.content.partition(fs.Tokens.SEP)
+            if kind == _StructStore.JOURNAL and body:
+                journal_msgs.append(msg)
+            elif kind == _StructStore.RECORD and body:
+                # Records of checkpoint interrupted before its marker.
+                stale.append(msg)
+            elif (kind == _StructStore.CHECKPOINT and body.isdigit()) or not body:
+                # Checkpoint marker or legacy tree.
+                checkpoint = msg
+                break
+            else:
+                return errors.BROKEN_MEMORY
+
+        if checkpoint is None:
+            return errors.BROKEN_MEMORY
+
+        replaced = [msg.id for msg in [checkpoint, *stale, *journal_msgs]]
+        kind, _, body = checkpoint.content.partition(fs.Tokens.SEP)
+        if body:
+            struct = fs.FS_Dir("~", None, record=int(body), loaded=False)
+            store = _StructStore(channel, removed_messages, replaced, len(journal_msgs))
+            status = await store.load_dir(struct)
+            if isinstance(status, errors.T_Error):
+                return status
+
+        else:
+            try:
+                data = base64.b64decode(checkpoint.content)
+                if binary.is_binary(data):
+                    struct = binary.load_tree(data)
+                else:
+                    struct = parser.Parser(data).parse()
+            except ValueError:
+                return errors.BROKEN_MEMORY
+
+            # Legacy tree is saved as records on next commit.
+            store = _StructStore(channel, removed_messages, replaced, limits.STRUCT_JOURNAL_SIZE)
+            store._dirty[id(struct)] = struct
+
+        for msg in reversed(journal_msgs):
+            for record in journal.unpack(msg.content.partition(fs.Tokens.SEP)[2]):
+                status = await store.__replay(struct, record)
+                if isinstance(status, errors.T_Error):
+                    return status
+
+        return store, struct
+
+    def __init__(self, channel: discord.TextChannel, removed_messages: set[int], replaced: list[int], journal_size: int) -> None:
+        self.channel = channel
+        self.journal_size = journal_size
+        self._replaced = replaced  # Messages removed after next checkpoint.
+        self._known = set(replaced)
+        self._removed_messages = removed_messages
+        self._sending = 0
+        self._pages: dict[int, list[int]] = {}  # record -> ids of it's pages
+        self._dirty: dict[int, fs.FS_Dir] = {}  # Directories changed since last checkpoint.
+        self._loading: dict[int, asyncio.Task] = {}
+        self._semaphore = asyncio.Semaphore(limits.REBUILD_CONCURRENCY)
+        self.codec = codecs.get_codec(codecs.DEFAULT_CODEC)
+
+    def is_own(self, message_id: int) -> bool:
+        """ Check if message was sent by this instance (unknown messages sent meanwhile are not reported). """
+        return message_id in self._known or self._sending > 0
+
+    async def load_dir(self, dir: fs.FS_Dir) -> T_OpStatus:
+        """ Read directory's entries from it's record (once, concurrent calls wait for the same read). """
+        if dir.loaded:
+            return True
+
+        task = self._loading.get(id(dir))
+        if task is None:
+            task = asyncio.create_task(self.__load_dir(dir))
+            self._loading[id(dir)] = task
+
+        try:
+            return await task
+        finally:
+            self._loading.pop(id(dir), None)
+
+    async def __load_dir(self, dir: fs.FS_Dir) -> T_OpStatus:
+        pages = []
+        parts = []
+        next_id = dir.record
+
+        try:
+            while next_id is not None:
+                async with self._semaphore:
+                    msg = await self.channel.fetch_message(next_id)
+
+                kind, _, body = msg.content.partition(fs.Tokens.SEP)
+                next_part, _, part = body.partition(fs.Tokens.SEP)
+                if kind != self.RECORD:
+                    raise ValueError(f"Not a record page: {msg.id}")
+
+                pages.append(msg.id)
+                parts.append(part)
+                next_id = None if next_part == self.END else int(next_part)
+
+            dir_records.load(dir, self.codec.decode_chunks(parts))
+
+        except (ValueError, discord.HTTPException) as exc:
+            Log.error(f"Failed to read record of directory {dir.path_to()} at guild {self.channel.guild.name}: {exc}")
+            return errors.BROKEN_MEMORY
+
+        self._pages[dir.record] = pages
+        dir.loaded = True
+        return True
+
+    async def load_subtree(self, dir: fs.FS_Dir) -> T_OpStatus:
+        """ Read directory and all it's subdirectories. """
+        status = await self.load_dir(dir)
+        if isinstance(status, errors.T_Error):
+            return status
+
+        for status in await asyncio.gather(*(self.load_subtree(child) for child in list(dir.dirs))):
+            if isinstance(status, errors.T_Error):
+                return status
+
+        return True
+
+    async def resolve(self, cwd: fs.FS_Dir, path: str) -> fs._FS_Obj | None | errors.T_Error:
+        """ Return object at path relative to cwd (see FS_Dir.move_to), directories along path are read first. """
+        target = cwd
+
+        for i, part in enumerate(path.replace("\\", "/").split("/")):
+            if not part:
+                continue
+
+            if not isinstance(target, fs.FS_Dir) or (part == "~" and i != 0):
+                return None
+
+            status = await self.load_dir(target)
+            if isinstance(status, errors.T_Error):
+                return status
+
+            target = target.move_to(part)
+
+        if isinstance(target, fs.FS_Dir):
+            status = await self.load_dir(target)
+            if isinstance(status, errors.T_Error):
+                return status
+
+        return target
+
+    def apply(self, struct: fs.FS_Dir, record: str) -> None:
+        """ Apply journal record to tree (directories it changes must be read). Raises ValueError for invalid record. """
+        dir, removed = journal.apply(struct, record)
+        self._dirty[id(dir)] = dir
+
+        # Records of removed directories are removed with next checkpoint.
+        if isinstance(removed, fs.FS_Dir):
+            for obj in [removed, *removed.walk()]:
+                if isinstance(obj, fs.FS_Dir) and obj.record is not None:
+                    self._replaced.extend(self._pages.pop(obj.record, [obj.record]))
+
+    async def __replay(self, struct: fs.FS_Dir, record: str) -> T_OpStatus:
+        kind, path = journal.target(record)
+        parent_path, name = journal.split_path(path)
+
+        parent = await self.resolve(struct, parent_path)
+        if isinstance(parent, errors.T_Error):
+            return parent
+
+        if kind == journal.REMOVE and isinstance(parent, fs.FS_Dir):
+            target = parent.move_to(name)
+            if isinstance(target, fs.FS_Dir):
+                status = await self.load_subtree(target)
+                if isinstance(status, errors.T_Error):
+                    return status
+
+        if kind == journal.SET_QUOTA:
+            # Quota is saved in directory's own record.
+            target = await self.resolve(struct, path)
+            if isinstance(target, errors.T_Error):
+                return target
+
+        try:
+            self.apply(struct, record)
+        except ValueError:
+            Log.error(f"Invalid files structure journal record at guild {self.channel.guild.name}: {record}")
+            return errors.BROKEN_MEMORY
+
+        return True
+
+    async def __send(self, content: str) -> discord.Message:
+        self._sending += 1
+        try:
+            message = await self.channel.send(content)
+        finally:
+            self._sending -= 1
+
+        self._known.add(message.id)
+        return message
+
+    async def append(self, records: list[str]) -> T_OpStatus:
+        """ Save records of committed mutations. """
+        for body in journal.pack(records, limits.MSG_SIZE - 2):
+            try:
+                message = await self.__send(f"{self.JOURNAL}{fs.Tokens.SEP}{body}")
+            except discord.HTTPException:
+                Log.error(f"Failed to save files structure journal at guild {self.channel.guild.name}")
+                return errors.BROKEN_MEMORY
+
+            self._replaced.append(message.id)
+            self.journal_size += 1
+
+        return True
+
+    def is_full(self) -> bool:
+        return self.journal_size >= limits.STRUCT_JOURNAL_SIZE
+
+    async def __write_record(self, data: bytes) -> list[int]:
+        """ Send record pages from the last one (each page points to next one). Returns page ids, head first. """
+        parts = self.codec.encode_chunks(data, limits.MSG_SIZE - self.HEADER_SIZE) or [""]
+
+        pages = []
+        next_id = self.END
+        for part in reversed(parts):
+            message = await self.__send(f"{self.RECORD}{fs.Tokens.SEP}{next_id}{fs.Tokens.SEP}{part}")
+            pages.insert(0, message.id)
+            next_id = message.id
+
+        return pages
+
+    async def checkpoint(self, struct: fs.FS_Dir) -> None:
+        """
+        Write records of directories changed since last checkpoint (and their parents), then
+        marker pointing to new root's record. Tree must not contain not committed mutations.
+        """
+        # Snapshot of changed directories is taken at once, tree can change while records are sent.
+        changed = set()
+        for dir in self._dirty.values():
+            while dir is not None and id(dir) not in changed:
+                changed.add(id(dir))
+                dir = dir.parent_dir
+
+        snapshot: list[tuple[fs.FS_Dir, list[binary.T_FileEntry], list[tuple[str, fs.FS_Dir, int | None, tuple[int, int, int]]], int | None]] = []
+
+        def take(dir: fs.FS_Dir) -> None:
+            for child in dir.dirs:
+                if id(child) in changed or child.record is None:
+                    take(child)
+            dirs = [(child.name, child, child.record, (child.total_size, child.files_count, child.dirs_count)) for child in dir.dirs]
+            snapshot.append((dir, dir_records.snapshot(dir), dirs, dir.quota))
+
+        take(struct)
+        dirty, self._dirty = self._dirty, {}
+        replaced, self._replaced = self._replaced, []
+
+        written: dict[int, list[int]] = {}
+        try:
+            for dir, files, dirs, quota in snapshot:
+                refs = [(name, written[id(child)][0] if id(child) in written else record, totals) for name, child, record, totals in dirs]
+                written[id(dir)] = await self.__write_record(dir_records.dump(files, refs, quota))
+
+            marker = await self.__send(f"{self.CHECKPOINT}{fs.Tokens.SEP}{written[id(struct)][0]}")
+
+        except discord.HTTPException:
+            # Journal stays valid, records written so far are removed with next checkpoint.
+            Log.error(f"Failed to save files structure checkpoint at guild {self.channel.guild.name}")
+            self._dirty.update(dirty)
+            self._replaced = replaced + self._replaced + [page for pages in written.values() for page in pages]
+            return
+
+        self._replaced.append(marker.id)
+        self.journal_size = 0
+
+        for dir, *_ in snapshot:
+            old_record, dir.record = dir.record, written[id(dir)][0]
+            self._pages[dir.record] = written[id(dir)]
+
+            if dir.base_dir() is not struct:
+                # Removed while checkpoint was written (old record is already replaced).
+                self._replaced.extend(written[id(dir)])
+            elif old_record is not None:
+                replaced.extend(self._pages.pop(old_record, [old_record]))
+
+        for message_id in replaced:
+            self._removed_messages.add(message_id)
+            try:
+                await self.channel.get_partial_message(message_id).delete()
+            except discord.NotFound:
+                self._removed_messages.discard(message_id)
+            except discord.HTTPException:
+                # Message is still there (and still ours), it's removed with next checkpoint.
+                Log.error(f"Failed to remove replaced files structure message {message_id} at guild {self.channel.guild.name}")
+                self._removed_messages.discard(message_id)
+                self._replaced.append(message_id)
+                continue
+
+            self._known.discard(message_id)
+
+        Log.info(f"Saved files structure checkpoint ({len(snapshot)} records) at guild {self.channel.guild.name}")
+
+
 class DriveGuild:
     _register: dict[int, "DriveGuild"] = {}
 
@@ -475,9 +1751,13 @@ class DriveGuild:
             await panic_guild_error(guild, "Invalid write role.")
             return None
 
-        data_manager = await MemoryManager.init(guild)
+        data_manager = await MemoryManager.init(guild, logs_channel.category)
 
         instance = DriveGuild(guild, logs_channel, struct_channel, console_channel, read_role, write_role, data_manager)
+        if ids_reg.placement in data_manager.placements:
+            instance.placement = ids_reg.placement
+        else:
+            Log.warn(f"Unknown placement policy {ids_reg.placement} at: {guild.name}, using {DEFAULT_PLACEMENT}")
         DriveGuild._register[guild.id] = instance
         return instance
 
@@ -500,42 +1780,50 @@ class DriveGuild:
         self.memory_manager = data_manager
         self.locked_files = set()
         self._cwd_cache = {}
+        self.placement = DEFAULT_PLACEMENT
+        self._struct: fs.FS_Dir | None = None  # In-memory (authoritative) file tree.
+        self._struct_store: _StructStore | None = None
+        self._struct_load: asyncio.Task | None = None
+        self.struct_version = 0  # Increased on every tree load and commit.
+        self._pending_commit: asyncio.Future | None = None  # Commit joined by new mutations.
+        self._pending_records: list[str] = []  # Journal records of pending commit.
+        self._commit_lock = asyncio.Lock()
 
         Log.info(f"DriveGuild instance initialized for: {guild.name}")
 
-    async def __find_struct_msg(self) -> discord.Message | None:
-        message = [message async for message in self.struct_channel.history(limit=1)]
-        message = message[0] if message else None
-
-        if message is None:
-            return None
-
-        message = await message.fetch()
-
-        if message.author.id != client.user.id:
-            Log.warn(f"Latest message on struct channel does not belong to bot at: {self.guild.name}")
-            await message.delete()
-            return await self.__find_struct_msg()
-
-        return message
-
     async def _read_file(self, file: fs.FS_File) -> bytes | errors.T_Error:
         if file.path_to() in self.locked_files:
             await self.log(f"failed to read file {file.name} (file is locked due to ongoing operation)")
             return errors.FILE_LOCKED
 
-        content = ""
+        codec = codecs.get_codec(file.codec)
+        if codec is None and file.codec != codecs.ATTACHMENT_CODEC:
+            await self.log(f"failed to read file {file.name} (unknown codec: {file.codec})")
+            return errors.UNKNOWN_CODEC
+
         content_messages = await self.memory_manager.get_content_trace(file.mem_addr)
         if isinstance(content_messages, errors.T_Error):
             return content_messages
 
-        for message in content_messages:
-            chunk = message.content.split("@")[0]
-            if chunk == fs.BLANK_FILE_CONTENT:
-                chunk = ""
-            content += chunk
+        if file.codec == codecs.ATTACHMENT_CODEC:
+            content = await self.memory_manager.read_attachments(content_messages)
+            if isinstance(content, errors.T_Error):
+                return content
+        else:
+            chunks = [message.content.split("@")[0] for message in content_messages]
+            content = codec.decode_chunks(chunks)
 
-        return base64.b64decode(content)
+        try:
+            content = await asyncio.to_thread(compression.decompress, file.compression, content)
+        except ValueError as exc:
+            await self.log(f"failed to read file {file.name} (corrupted compressed content: {exc})")
+            return errors.BROKEN_MEMORY
+
+        if content is None:
+            await self.log(f"failed to read file {file.name} (unknown compression: {file.compression})")
+            return errors.UNKNOWN_CODEC
+
+        return content
 
     def get_permissions(self, user_or_id: int | discord.Member) -> DrivePermissions:
         """ Return user's permissions based on it's roles. If user was not found, lowest permissions are returned. """ 
@@ -578,48 +1866,177 @@ class DriveGuild:
         
         await self.log(f"Updated {member.name}'s permissions to: {str(new_perms)}")
 
+    async def flush(self) -> None:
+        """ Save all pending (write-behind) changes. """
+        await self.memory_manager.flush()
+
+    async def set_placement(self, policy_id: str) -> T_OpStatus:
+        """ Set default chunk placement policy for all guild's writes. """
+        if policy_id not in self.memory_manager.placements:
+            return errors.UNKNOWN_PLACEMENT
+
+        guilds_ids_db.update(self.guild.id, {"placement": policy_id})
+        self.placement = policy_id
+        await self.log(f"Chunk placement policy set to: {policy_id}")
+        return True
+
     async def log(self, message: str) -> None:
         Log.info(f"(drive@{self.guild.name}) {message}")
         content = f"{get_time()} | `{message}`"
         await self.logs_channel.send(content)
 
     async def get_struct(self) -> fs.FS_Dir:
-        message = await self.__find_struct_msg()
-        if message is None:
-            await panic_guild_error(self.guild, "Missing files structure message.")
-            return None
+        """
+        Return in-memory file tree. It's read from struct channel only on first use
+        and after external change of struct channel (see check_struct_message).
+        """
+        if self._struct is not None:
+            return self._struct
 
-        content_enc = message.content
-        content_raw = base64.b64decode(content_enc).decode()
+        # Concurrent first uses wait for the same load.
+        if self._struct_load is None:
+            self._struct_load = asyncio.create_task(self.__load_struct())
 
+        task = self._struct_load
         try:
-            struct = parser.Parser(content_raw).parse()
-        except ValueError:
-            await panic_guild_error(self.guild, "Failed to parse structure.")
+            return await task
+        finally:
+            if self._struct_load is task:
+                self._struct_load = None
+
+    async def __load_struct(self) -> fs.FS_Dir | None:
+        loaded = await _StructStore.load(self.struct_channel, self.memory_manager._removed_messages)
+        if isinstance(loaded, errors.T_Error):
+            await panic_guild_error(self.guild, "Failed to load files structure.")
             return None
 
+        self._struct_store, struct = loaded
+        self._struct = struct
+        self.struct_version += 1
+        Log.info(f"Loaded files structure (version {self.struct_version}) at guild {self.guild.name}")
         return struct
 
-    async def set_struct(self, struct: fs.FS_Dir) -> None:
-        struct_export = struct.export()
-        content = base64.b64encode(struct_export.encode()).decode()
-
-        if len(content) > limits.MSG_SIZE:
-            await self.log("Couldn't save new structure: message too long!")
+    def invalidate_struct(self) -> None:
+        """ Drop in-memory tree (and not committed mutations of it), it's read again on next use. """
+        self._struct = None
+        self._struct_store = None
+        self._pending_records = []
+        if self._pending_commit is not None:
+            self._pending_commit.set_result(errors.STRUCT_OUTDATED)
+            self._pending_commit = None
+
+    def check_struct_message(self, message_id: int, edited: bool = False) -> None:
+        """ Called on new or edited bot's message at struct channel. Tree is reloaded if it wasn't written by this instance. """
+        if self._struct_store is None:
             return
 
-        message = await self.__find_struct_msg()
-        if message is None:
-            panic_guild_error(self.guild, "Missing structure message.")
+        if edited or not self._struct_store.is_own(message_id):
+            Log.warn(f"Files structure changed externally at guild {self.guild.name}, reloading...")
+            self.invalidate_struct()
+
+    def in_struct(self, obj: fs._FS_Obj) -> bool:
+        """ Check if object is linked to current in-memory tree (not removed nor left from reloaded tree). """
+        return obj.base_dir() is self._struct
+
+    async def mutate(self, mutation: Callable[[], errors.T_Error | list[str]]) -> T_OpStatus:
+        """
+        Validate tree state with mutation, then apply and commit journal records it returns.
+        Mutations are applied in order of calls, each at once (mutation can't await, so
+        records are applied to tree state they were validated on). Mutations applied while
+        previous commit is in flight are committed together. Returns mutation's error or
+        commit status.
+        """
+        records = mutation()
+        if isinstance(records, errors.T_Error):
+            return records
+
+        if self._struct_store is None:
+            return errors.STRUCT_OUTDATED
+
+        try:
+            for record in records:
+                self._struct_store.apply(self._struct, record)
+        except ValueError as exc:
+            Log.error(f"Failed to apply files structure mutation at guild {self.guild.name}: {exc}")
+            return errors.INVALID_PATH
+
+        self._pending_records.extend(records)
+        return await self.__commit()
+
+    async def __commit(self) -> T_OpStatus:
+        if self._pending_commit is None:
+            self._pending_commit = asyncio.get_running_loop().create_future()
+            asyncio.create_task(self.__run_commit(self._pending_commit))
+
+        return await asyncio.shield(self._pending_commit)
+
+    async def __run_commit(self, commit: asyncio.Future) -> None:
+        async with self._commit_lock:
+            if commit.done():
+                return  # Dropped by invalidate_struct.
+
+            # Later mutations join next commit.
+            if self._pending_commit is commit:
+                self._pending_commit = None
+
+            records, self._pending_records = self._pending_records, []
+            try:
+                commit.set_result(await self.set_struct(self._struct, records))
+            except Exception as exc:
+                commit.set_exception(exc)
+
+    async def set_struct(self, struct: fs.FS_Dir, records: list[str]) -> T_OpStatus:
+        """ Save mutation records of in-memory tree (use mutate to change it). """
+        store = self._struct_store
+        if struct is None or struct is not self._struct or store is None:
+            # Tree reloaded meanwhile.
+            Log.warn(f"Dropped commit of outdated files structure at guild {self.guild.name}")
+            return errors.STRUCT_OUTDATED
+
+        status = await store.append(records)
+        if isinstance(status, errors.T_Error):
+            # Mutations are dropped, last saved tree is loaded again.
+            self.invalidate_struct()
+            return status
+
+        self.struct_version += 1
+
+        # Checkpoint can't contain mutations applied after these records (they would be replayed twice).
+        if store.is_full() and not self._pending_records and store is self._struct_store:
+            await store.checkpoint(struct)
+
+        return True
+
+    async def resolve(self, cwd: fs.FS_Dir, path: str) -> fs._FS_Obj | None:
+        """ Return object at path relative to cwd (see FS_Dir.move_to), reading directories along path. """
+        store = self._struct_store
+        if store is None or not self.in_struct(cwd):
+            return cwd.move_to(path)  # Tree left from before reload.
+
+        target = await store.resolve(cwd, path)
+        if isinstance(target, errors.T_Error):
+            await self.log(f"Failed to read files structure path: {path}")
             return None
 
-        await message.edit(content=content)
+        return target
+
+    async def load_subtree(self, dir: fs.FS_Dir) -> T_OpStatus:
+        """ Read all directories under dir (before walking it). """
+        store = self._struct_store
+        if store is None or not self.in_struct(dir):
+            return True
+
+        status = await store.load_subtree(dir)
+        if isinstance(status, errors.T_Error):
+            await self.log(f"Failed to read files structure under: {dir.path_to()}")
+
+        return status
 
     async def get_cwd(self, user_id: int, _ctx: commands.Context | None = None) -> tuple[fs.FS_Dir, bool]:
         """ Return user's current working directory. Returns (FS_DIR, HAS_CHANGED)"""
         struct = await self.get_struct()
         cwd_path = self._cwd_cache.get(user_id, fs.HOME_DIR)
-        cwd = struct.move_to(cwd_path)
+        cwd = await self.resolve(struct, cwd_path)
 
         if cwd is None:
             self.set_cwd(user_id, fs.HOME_DIR)
@@ -657,7 +2074,7 @@ class DriveGuild:
             await self.log(f"{uid} failed to create dir {name} (cwd error)")
             return errors.INVALID_PATH
 
-        target_parent = cwd.move_to(os.path.dirname(path) or '.')
+        target_parent = await self.resolve(cwd, os.path.dirname(path) or '.')
         if target_parent is None:
             await self.log(f"{uid} failed to create dir {path} (target directory not found)")
             return errors.INVALID_PATH
@@ -666,26 +2083,41 @@ class DriveGuild:
             await self.log(f"{uid} failed to create dir {path} (target directory is a file)")
             return errors.INVALID_PATH
 
-        if target_parent.has_object(name):
-            return errors.NAME_IN_USE
+        def insert_dir() -> errors.T_Error | list[str]:
+            if not self.in_struct(target_parent):
+                return errors.STRUCT_OUTDATED
+            if target_parent.has_object(name):
+                return errors.NAME_IN_USE
+            return [journal.make_dir(target_parent.path_to() + name)]
 
-        fs.FS_Dir(name, target_parent)
+        status = await self.mutate(insert_dir)
+        if isinstance(status, errors.T_Error):
+            return status
 
-        base = target_parent.base_dir()
-        await self.set_struct(base)
         await self.log(f"{uid} created dir {name} at: {target_parent.path_to()}")
 
-    async def create_file(self, uid: int, path: str) -> T_OpStatus:
+    async def create_file(self,
+                          uid: int,
+                          path: str,
+                          content: str | bytes | None = None,
+                          skip_encoding: bool = False,
+                          placement: str | None = None
+                          ) -> T_OpStatus:
+        """ Create blank file or file with content (same formats and placement as write_file). """
         name = os.path.basename(path)
         if not fs.is_object_name_valid(name):
             return errors.INVALID_NAME
 
+        placement = placement or self.placement
+        if placement not in self.memory_manager.placements:
+            return errors.UNKNOWN_PLACEMENT
+
         cwd, cwd_ok = await self.get_cwd(uid)
         if not cwd_ok:
             await self.log(f"{uid} failed to create file {path} (cwd error)")
             return errors.INVALID_PATH
 
-        target_parent = cwd.move_to(os.path.dirname(path) or '.')
+        target_parent = await self.resolve(cwd, os.path.dirname(path) or '.')
         if target_parent is None:
             await self.log(f"{uid} failed to create file {path} (target directory not found)")
             return errors.INVALID_PATH
@@ -697,18 +2129,40 @@ class DriveGuild:
         if target_parent.has_object(name):
             return errors.NAME_IN_USE
 
-        content_msg = await self.memory_manager.allocate_memory_chunk(len(fs.BLANK_FILE_CONTENT))
-        if isinstance(content_msg, errors.T_Error):
-            return content_msg
-
-        await content_msg.edit(content=fs.BLANK_FILE_CONTENT + "@END")
-        mem_addr = fs.MemoryAddress.from_message(content_msg)
+        raw_content = None if content is None else self.__raw_content(content, skip_encoding)
+        if raw_content is not None and target_parent.over_quota(len(raw_content)) is not None:
+            return errors.QUOTA_EXCEEDED
+
+        new_file = fs.FS_File(name, None, None, 1)
+        if raw_content is None:
+            header_msg = await self.memory_manager.write_manifest([])
+            if isinstance(header_msg, errors.T_Error):
+                return header_msg
+            new_file.mem_addr = fs.MemoryAddress.from_message(header_msg)
+
+        else:
+            # New file is linked in structure after all it's chunks are sent.
+            status = await self.__store_content(new_file, raw_content, placement=placement)
+            if isinstance(status, errors.T_Error):
+                await self.log(f"{uid} failed to create file {path}: {status}")
+                return status
+
+        def insert_file() -> errors.T_Error | list[str]:
+            # Name could be taken (or parent removed) while content was stored.
+            if not self.in_struct(target_parent):
+                return errors.STRUCT_OUTDATED
+            if target_parent.has_object(name):
+                return errors.NAME_IN_USE
+            if target_parent.over_quota(new_file.size) is not None:
+                return errors.QUOTA_EXCEEDED
+            return [journal.put_file(target_parent.path_to() + name, new_file)]
+
+        status = await self.mutate(insert_file)
+        if isinstance(status, errors.T_Error):
+            await self.log(f"{uid} failed to create file {path}: {status}")
+            await self.memory_manager.wipe_file(new_file)
+            return status
 
-        new_file = fs.FS_File(name, target_parent, mem_addr, 1)
-        target_parent.insert_file(new_file)
-
-        base = target_parent.base_dir()
-        await self.set_struct(base)
         await self.log(f"{uid} created file {name} at: {target_parent.path_to()}")
         return True
 
@@ -717,26 +2171,42 @@ class DriveGuild:
         if not cwd_ok:
             return errors.INVALID_PATH
 
-        target_obj = cwd.move_to(path)
+        target_obj = await self.resolve(cwd, path)
         if target_obj is None:
             return errors.INVALID_PATH
         target_path = target_obj.path_to()
 
-        if not target_obj.remove():
+        if isinstance(target_obj, fs.FS_File) and target_path in self.locked_files:
+            await self.log(f"{uid} failed to remove object: {target_path} (File is locked)")
+            return errors.FILE_LOCKED
+
+        if isinstance(target_obj, fs.FS_Dir):
+            # Whole subtree is wiped (and it's records removed).
+            status = await self.load_subtree(target_obj)
+            if isinstance(status, errors.T_Error):
+                return status
+
+        def unlink() -> errors.T_Error | list[str]:
+            if not self.in_struct(target_obj):
+                return errors.INVALID_PATH  # Already removed.
+
+            if target_obj.parent_dir is None:
+                return errors.PERMISSION_ERROR
+            return [journal.remove(target_obj.path_to())]
+
+        # Object is unlinked (and committed) first, so tree never points to wiped memory.
+        status = await self.mutate(unlink)
+        if status == errors.PERMISSION_ERROR:
             await self.log(f"{uid} failed to removed object: {target_path} (Permission error)")
-            return errors.PERMISSION_ERROR
+        if isinstance(status, errors.T_Error):
+            return status
 
         if isinstance(target_obj, fs.FS_File):
-            if target_path in self.locked_files:
-                await self.log(f"{uid} failed to remove object: {target_path} (File is locked)")
-                return errors.FILE_LOCKED
             await self.memory_manager.wipe_file(target_obj)
 
         if isinstance(target_obj, fs.FS_Dir):
             await self.memory_manager.wipe_dir(target_obj)
 
-        base = cwd.base_dir()
-        await self.set_struct(base)
         await self.log(f"{uid} removed object: {target_path}")
 
     async def get_file_content(self, uid: int, path: str) -> bytes | errors.T_Error:
@@ -745,7 +2215,7 @@ class DriveGuild:
             await self.log(f"{uid} failed to read file {path} (cwd error)")
             return errors.INVALID_PATH
 
-        target = cwd.move_to(path)
+        target = await self.resolve(cwd, path)
         if target is None:
             return errors.INVALID_PATH
 
@@ -760,7 +2230,7 @@ class DriveGuild:
             await self.log(f"{uid} failed to pull object {path} (cwd error)")
             return errors.INVALID_PATH
 
-        target = cwd.move_to(path)
+        target = await self.resolve(cwd, path)
         if target is None:
             await self.log(f"{uid} failed to pull object {path} (target not found)")
             return errors.INVALID_PATH
@@ -770,19 +2240,24 @@ class DriveGuild:
             if isinstance(content, errors.T_Error):
                 return content
             
-            content = content.decode()
             if len(content) > limits.DISCORD_FILE_SIZE_B:
                 return errors.FILE_TOO_BIG
 
-            return SendableFileData(target.name, io.StringIO(content), False)
+            return SendableFileData(target.name, io.BytesIO(content), False)
         
         # Zip directory.
+        status = await self.load_subtree(target)
+        if isinstance(status, errors.T_Error):
+            return status
+
         zipfile_content = io.BytesIO()
         with zipfile.ZipFile(zipfile_content, "w", compression=zipfile.ZIP_DEFLATED) as zf:
             for file in target.walk(file_only=True):
                 rel_path = file.path_to().removeprefix("~/")
                 content = await self._read_file(file)
-                zf.writestr(rel_path, content.decode())
+                if isinstance(content, errors.T_Error):
+                    return content
+                zf.writestr(rel_path, content)
             
         zip_name = target.name + ".zip"
         if target.name == "~":
@@ -792,13 +2267,28 @@ class DriveGuild:
         
         return SendableFileData(zip_name, zipfile_content, True)            
 
-    async def write_file(self, uid: int, path: str, content: str, skip_encoding: bool = False, fixed_size: int = None) -> T_OpStatus:
+    async def write_file(self,
+                         uid: int,
+                         path: str,
+                         content: str | bytes,
+                         skip_encoding: bool = False,
+                         fixed_size: int = None,
+                         placement: str | None = None
+                         ) -> T_OpStatus:
+        """
+        Content is text, base64 encoded data (skip_encoding) or raw bytes.
+        New chunks are placed by given placement policy (guild's policy by default).
+        """
+        placement = placement or self.placement
+        if placement not in self.memory_manager.placements:
+            return errors.UNKNOWN_PLACEMENT
+
         cwd, cwd_ok = await self.get_cwd(uid)
         if not cwd_ok:
             await self.log(f"{uid} failed to write file {path} (cwd error)")
             return errors.INVALID_PATH
 
-        file = cwd.move_to(path)
+        file = await self.resolve(cwd, path)
         file: fs.FS_File
         if file is None:
             return errors.INVALID_PATH
@@ -810,86 +2300,90 @@ class DriveGuild:
             await self.log(f"{uid} failed to write file {file.name} (file is locked due to an ongoing operation.)")
             return errors.FILE_LOCKED
 
-        current_trace = await self.memory_manager.get_content_trace(file.mem_addr)
-        if isinstance(current_trace, errors.T_Error):
-            await self.log(f"{uid} failed to edit {file.name}: Broken file trace: {current_trace}")
-            return errors.BROKEN_MEMORY
-
-        b64_content = content
-        if not skip_encoding:
-            b64_content = base64.b64encode(content.encode()).decode()
-        new_content_chunks = self.memory_manager.split_content(b64_content)
-        self.locked_files.add(file.path_to())
-
-        file.size = len(content) if fixed_size is None else fixed_size
-        struct = cwd.base_dir()
-        await self.set_struct(struct)
-        await self.memory_manager.remove_from_cache(file)
-        
-        # Just override all used chunks.
-        if len(new_content_chunks) == len(current_trace):
-            for msg_chunk, content in zip(current_trace, new_content_chunks):
-                next_id = msg_chunk.content.split("@")[1]
-                new_content = content + f"@{next_id}"
-                await msg_chunk.edit(content=new_content)
-                
-            await self.memory_manager.cache_sizes(file)
-            self.locked_files.discard(file.path_to())
-            await self.log(f"{uid} edited file: {file.name}")
-            return True
-
-        # Allocate missing chunks if new messages required.
-        if len(new_content_chunks) > len(current_trace):
-            missing_chunks = len(new_content_chunks) - len(current_trace)
-            new_chunks_offset = len(current_trace) - 1
-            created_chunks = []
-
-            for i in range(missing_chunks):
-                alloc_size = len(new_content_chunks[new_chunks_offset + i])
-                msg_chunk = await self.memory_manager.allocate_memory_chunk(alloc_size)
-                if isinstance(msg_chunk, errors.T_Error):
-                    self.locked_files.discard(file.path_to())
-                    await self.log(f"{uid} failed to edit {file.name}: Out of memory")
-                    return msg_chunk
-
-                created_chunks.append(msg_chunk)
-
-            await self.log(f"Allocated additional {len(created_chunks)} chunks to edit file: {file.name}")
-
-            current_trace.extend(created_chunks)
-            for i, (msg, chunk_content) in enumerate(zip(current_trace, new_content_chunks)):
-                next_id = "END"
-                if i < len(current_trace) - 1:
-                    next_id = fs.MemoryAddress.from_message(current_trace[i + 1]).prepare_mem_addr()
-
-                content = chunk_content + f"@{next_id}"
-                await msg.edit(content=content)
-
-            await self.memory_manager.cache_sizes(file)
-            self.locked_files.discard(file.path_to())
-            await self.log(f"{uid} edited file: {file.name}")
-            return True
-
-        # Trim memory chunks.
-        if len(new_content_chunks) < len(current_trace):
-            not_used_chunks = current_trace[len(new_content_chunks):]
-            for msg in not_used_chunks:
-                await self.memory_manager.deallocate_message(msg)
-
-            current_trace = current_trace[:len(new_content_chunks)]
-
-            for i, (msg, content) in enumerate(zip(current_trace, new_content_chunks)):
-                next = msg.content.split("@")[1]
-                if i == len(current_trace) - 1:
-                    next = "END"
-
-                content += f"@{next}"
-                await msg.edit(content=content)
+        raw_content = self.__raw_content(content, skip_encoding)
+        new_size = len(raw_content) if fixed_size is None else fixed_size
+        if file.parent_dir.over_quota(new_size - file.size) is not None:
+            await self.log(f"{uid} failed to write file {file.name} (directory quota exceeded)")
+            return errors.QUOTA_EXCEEDED
+
+        # Copy on write: new content gets its own manifest (unchanged chunks are shared)
+        # and is committed at once. Old messages are released only after the commit,
+        # so failed write leaves old content untouched. File is locked until then.
+        file_path = file.path_to()
+        self.locked_files.add(file_path)
+        try:
+            current_trace = await self.memory_manager.get_file_trace(file.mem_addr)
+            if isinstance(current_trace, errors.T_Error):
+                await self.log(f"{uid} failed to edit {file.name}: Broken file trace: {current_trace}")
+                return errors.BROKEN_MEMORY
+
+            new_file = fs.FS_File(file.name, None, None, 0)
+            status = await self.__store_content(new_file, raw_content, fixed_size, placement)
+            if isinstance(status, errors.T_Error):
+                await self.log(f"{uid} failed to edit {file.name}: {status}")
+                return status
+
+            def put_new_file() -> errors.T_Error | list[str]:
+                if not self.in_struct(file):
+                    return errors.STRUCT_OUTDATED
+                if file.parent_dir.over_quota(new_file.size - file.size) is not None:
+                    return errors.QUOTA_EXCEEDED
+                return [journal.put_file(file.path_to(), new_file)]
+
+            status = await self.mutate(put_new_file)
+            if isinstance(status, errors.T_Error):
+                await self.log(f"{uid} failed to edit {file.name}: {status}")
+                await self.memory_manager.wipe_file(new_file)
+                return status
+
+            manifest_msgs, content_msgs = current_trace
+            await self.memory_manager.release_messages(manifest_msgs + content_msgs)
+        finally:
+            self.locked_files.discard(file_path)
+
+        await self.log(f"{uid} edited file: {file.name}")
+        return True
 
-            await self.memory_manager.cache_sizes(file)
-            self.locked_files.discard(file.path_to())
-            await self.log(f"{uid} edited file: {file.name}")
-            return True
+    @staticmethod
+    def __raw_content(content: str | bytes, skip_encoding: bool) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return base64.b64decode(content) if skip_encoding else content.encode()
+
+    async def __store_content(self,
+                              file: fs.FS_File,
+                              raw_content: bytes,
+                              fixed_size: int | None = None,
+                              placement: str = DEFAULT_PLACEMENT
+                              ) -> T_OpStatus:
+        """ Save content in new manifest and set (not linked) file's metadata. """
+        # Compression and chunking of big content take a while, event loop keeps running meanwhile.
+        compression_id, stored_content = await asyncio.to_thread(compression.compress, raw_content)
+
+        if len(stored_content) > limits.ATTACHMENT_THRESHOLD_B:
+            codec_id = codecs.ATTACHMENT_CODEC
+            size = limits.DISCORD_FILE_SIZE_B
+            pieces = [stored_content[i:i + size] for i in range(0, len(stored_content), size)]
+
+        else:
+            codec_id = codecs.DEFAULT_CODEC
+            pieces = await asyncio.to_thread(chunking.split, stored_content, codecs.get_codec(codec_id).max_bytes(limits.MSG_SIZE))
+
+        # Unchanged and already stored chunks are shared, not written again.
+        addresses = await self.memory_manager.store_chunks(codec_id, pieces, placement)
+        if isinstance(addresses, errors.T_Error):
+            return addresses
+
+        header_msg = await self.memory_manager.write_manifest(addresses)
+        if isinstance(header_msg, errors.T_Error):
+            await self.memory_manager.release_chunks(addresses)
+            return header_msg
+
+        file.mem_addr = fs.MemoryAddress.from_message(header_msg)
+        file.resize(len(raw_content) if fixed_size is None else fixed_size)
+        file.codec = codec_id
+        file.compression = compression_id
+        return True
 
     async def rename(self, uid: int, path: str, new_name: str) -> T_OpStatus:
         if not fs.is_object_name_valid(new_name):
@@ -899,18 +2393,55 @@ class DriveGuild:
         if not cwd_ok:
             return errors.INVALID_PATH
         
-        target = cwd.move_to(path)
+        target = await self.resolve(cwd, path)
+        if target is None:
+            return errors.INVALID_PATH
+
         parent = target.parent_dir
         if parent is None:
             return errors.CANNOT_RENAME
         
-        if parent.has_object(new_name):
-            return errors.NAME_IN_USE
-
         old_path = target.path_to()
-        target.name = new_name
-        base = target.base_dir()
-        
+
+        def set_name() -> errors.T_Error | list[str]:
+            if not self.in_struct(target):
+                return errors.INVALID_PATH
+            if target.parent_dir.has_object(new_name):
+                return errors.NAME_IN_USE
+
+            return [journal.rename(target.path_to(), new_name)]
+
+        status = await self.mutate(set_name)
+        if isinstance(status, errors.T_Error):
+            return status
+
         await self.log(f"{uid} Renamed object: {old_path} -> {new_name}")
-        await self.set_struct(base)
+        return True
+
+    async def set_quota(self, uid: int, path: str, quota: int | None) -> T_OpStatus:
+        """ Set max total size of files under directory (None removes quota). """
+        if quota is not None and quota < 0:
+            return errors.INVALID_QUOTA
+
+        cwd, cwd_ok = await self.get_cwd(uid)
+        if not cwd_ok:
+            return errors.INVALID_PATH
+
+        target = await self.resolve(cwd, path)
+        if target is None:
+            return errors.INVALID_PATH
+
+        if isinstance(target, fs.FS_File):
+            return errors.PATH_TO_FILE
+
+        def set_target_quota() -> errors.T_Error | list[str]:
+            if not self.in_struct(target):
+                return errors.STRUCT_OUTDATED
+            return [journal.set_quota(target.path_to(), quota)]
+
+        status = await self.mutate(set_target_quota)
+        if isinstance(status, errors.T_Error):
+            return status
+
+        await self.log(f"{uid} set quota of {target.path_to()} to: {quota}")
         return True
@@ -10,6 +10,7 @@ class _GuildPointers:
     read_role: int
     write_role: int
     admin_role: int
+    placement: str = "first-fit"  # Chunk placement policy id (see modules.discord.data).
     
     
 guilds_ids_db = database.Database[_GuildPointers](_GuildPointers)
@@ -14,9 +14,15 @@ PERMISSION_ERROR = "Missing permissions."
 FILE_TOO_BIG = "File is too big."
 CANNOT_RENAME = "Cannot rename this object."
 NAME_IN_USE = "This name is already in use."
+QUOTA_EXCEEDED = "Directory quota exceeded."
+INVALID_QUOTA = "Invalid quota."
 
 # Memory.
 MEMORY_ERROR = "Out of memory."
 BROKEN_MEMORY = "Broken memory trace."
 INVALID_MEM_ADDR = "Invalid memory address."
 FILE_LOCKED = "File is locked due to ongoing operation."
+UNKNOWN_CODEC = "Unknown content codec."
+UNKNOWN_PLACEMENT = "Unknown placement policy."
+STRUCT_OUTDATED = "Files structure changed during operation."
+SEND_FAILED = "Failed to send data."
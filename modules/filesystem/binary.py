@@ -0,0 +1,255 @@
+"""
+Binary files structure format.
+
+Blob starts with header (MAGIC, format version, blob kind) so it's never
+mistaken for text format (which never starts with MAGIC). Header is
+followed by count of integers, integers (varints) and utf-8 names (concatenated,
+their lengths in characters are part of integers). Channel ids and codec names
+are written once in tables and referenced by index, message ids are written as
+difference (zigzag) from previous one:
+    ints:   channels count, channel ids, strings count, string lengths, body
+    tree:   dir = name length, files count, files, dirs count, dirs (pre-order)
+    record: quota + 1 (0 if none), files count, files, dirs count, dirs
+    dir:    name length, record id, total size, files count, dirs count (subdirectory's totals)
+    file:   name length, channel index, message id, size, codec index, compression index
+"""
+from modules.filesystem.fs import FS_Dir, FS_File, MemoryAddress
+
+
+MAGIC = 0xFD  # Not valid first byte of utf-8 text.
+VERSION = 1
+TREE = 0
+RECORD = 1
+
+T_FileEntry = tuple[str, int, int, int, str, str]  # name, channel id, message id, size, codec, compression
+T_DirEntry = tuple[str, int, tuple[int, int, int]]  # name, record id, totals (size, files, dirs)
+
+
+def is_binary(data: bytes) -> bool:
+    return bool(data) and data[0] == MAGIC
+
+
+def file_entry(file: FS_File) -> T_FileEntry:
+    return file.name, file.mem_addr.channel_id, file.mem_addr.message_id, file.size, file.codec, file.compression
+
+
+def _put_varints(out: bytearray, values: list[int]) -> None:
+    append = out.append
+    for value in values:
+        while value > 0x7F:
+            append((value & 0x7F) | 0x80)
+            value >>= 7
+        append(value)
+
+
+def _get_varints(data: bytes, pos: int, count: int) -> tuple[list[int], int]:
+    values = []
+    append = values.append
+
+    for _ in range(count):
+        byte = data[pos]
+        pos += 1
+        if byte < 0x80:
+            append(byte)
+            continue
+
+        result = byte & 0x7F
+        shift = 7
+        while True:
+            byte = data[pos]
+            pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        append(result)
+
+    return values, pos
+
+
+class _Writer:
+    def __init__(self, kind: int) -> None:
+        self.kind = kind
+        self.ints: list[int] = []
+        self.names: list[str] = []
+        self.channels: dict[int, int] = {}
+        self.strings: dict[str, int] = {}
+        self.last_id = 0
+
+    def name(self, name: str) -> None:
+        self.ints.append(len(name))
+        self.names.append(name)
+
+    def delta(self, value: int) -> None:
+        diff = value - self.last_id
+        self.last_id = value
+        self.ints.append(diff << 1 if diff >= 0 else (-diff << 1) - 1)
+
+    def files(self, files: list[T_FileEntry]) -> None:
+        ints, names = self.ints, self.names
+        channels, strings = self.channels, self.strings
+        last_id = self.last_id
+
+        ints.append(len(files))
+        for name, channel_id, message_id, size, codec, compression in files:
+            diff = message_id - last_id
+            last_id = message_id
+            names.append(name)
+            ints += (
+                len(name),
+                channels.setdefault(channel_id, len(channels)),
+                diff << 1 if diff >= 0 else (-diff << 1) - 1,
+                size,
+                strings.setdefault(codec, len(strings)),
+                strings.setdefault(compression, len(strings))
+            )
+
+        self.last_id = last_id
+
+    def dump(self) -> bytes:
+        tables = [len(self.channels), *self.channels, len(self.strings), *map(len, self.strings)]
+        out = bytearray((MAGIC, VERSION, self.kind))
+        _put_varints(out, [len(tables) + len(self.ints)])
+        _put_varints(out, tables)
+        _put_varints(out, self.ints)
+        out += "".join([*self.strings, *self.names]).encode()
+        return bytes(out)
+
+
+class _Reader:
+    def __init__(self, data: bytes, kind: int) -> None:
+        if not is_binary(data) or len(data) < 3:
+            raise ValueError("Not a binary files structure blob.")
+        if data[1] != VERSION:
+            raise ValueError(f"Unsupported files structure format version: {data[1]}")
+        if data[2] != kind:
+            raise ValueError(f"Unexpected files structure blob kind: {data[2]}")
+
+        (count,), pos = _get_varints(data, 3, 1)
+        self.ints, pos = _get_varints(data, pos, count)
+        self.names = data[pos:].decode()
+        self.i = 0
+        self.n = 0
+        self.last_id = 0
+
+        self.channels = [self.int() for _ in range(self.int())]
+        self.strings = [self.name() for _ in range(self.int())]
+
+    def int(self) -> int:
+        value = self.ints[self.i]
+        self.i += 1
+        return value
+
+    def name(self) -> str:
+        size = self.int()
+        start = self.n
+        self.n += size
+        return self.names[start:self.n]
+
+    def delta(self) -> int:
+        value = self.int()
+        self.last_id += -((value + 1) >> 1) if value & 1 else value >> 1
+        return self.last_id
+
+    def files(self) -> list[T_FileEntry]:
+        ints, names = self.ints, self.names
+        channels, strings = self.channels, self.strings
+        i, n, last_id = self.i + 1, self.n, self.last_id
+        files = []
+
+        for _ in range(ints[self.i]):
+            name_len, channel, diff, size, codec, compression = ints[i:i + 6]
+            i += 6
+            last_id += -((diff + 1) >> 1) if diff & 1 else diff >> 1
+            files.append((names[n:n + name_len], channels[channel], last_id, size, strings[codec], strings[compression]))
+            n += name_len
+
+        self.i, self.n, self.last_id = i, n, last_id
+        return files
+
+    def check_end(self) -> None:
+        if self.i != len(self.ints) or self.n != len(self.names):
+            raise ValueError("Invalid size of files structure blob.")
+
+
+def insert_entries(dir: FS_Dir, files: list[T_FileEntry], dirs: list[FS_Dir] = ()) -> None:
+    """ Link read entries to directory (at once, see FS_Dir.insert_many). Raises ValueError for duplicated name. """
+    dir.insert_many([
+        FS_File(name, None, MemoryAddress(channel_id, message_id), size, codec, compression)
+        for name, channel_id, message_id, size, codec, compression in files
+    ], dirs)
+
+
+def dump_tree(root: FS_Dir) -> bytes:
+    """ Serialize whole tree (all directories must be read). """
+    writer = _Writer(TREE)
+    stack = [root]
+
+    while stack:
+        dir = stack.pop()
+        writer.name(dir.name)
+        writer.files([file_entry(file) for file in dir.files])
+        writer.ints.append(len(dir.dirs))
+        stack.extend(reversed(dir.dirs))
+
+    return writer.dump()
+
+
+def load_tree(data: bytes) -> FS_Dir:
+    """ Read whole tree. Raises ValueError for invalid blob. """
+    try:
+        reader = _Reader(data, TREE)
+        root = None
+        stack: list[list] = []  # [directory, files, subdirectories, subdirectories left]
+
+        # Directory's entries are linked when all it's subdirectories are read and directory itself
+        # is linked to parent after (so totals of whole subtree are counted once).
+        while True:
+            dir = FS_Dir(reader.name(), None)
+            if root is None:
+                root = dir
+            files = reader.files()
+            stack.append([dir, files, [], reader.int()])
+
+            while stack and stack[-1][3] == 0:
+                dir, files, dirs, _ = stack.pop()
+                insert_entries(dir, files, dirs)
+                if stack:
+                    stack[-1][2].append(dir)
+                    stack[-1][3] -= 1
+            if not stack:
+                break
+
+    except IndexError as exc:
+        raise ValueError(f"Invalid files structure blob: {exc}") from None
+
+    reader.check_end()
+    return root
+
+
+def dump_record(files: list[T_FileEntry], dirs: list[T_DirEntry], quota: int | None = None) -> bytes:
+    """ Serialize directory record (files, subdirectories' record ids and totals, quota). """
+    writer = _Writer(RECORD)
+    writer.ints.append(0 if quota is None else quota + 1)
+    writer.files(files)
+    writer.ints.append(len(dirs))
+    for name, record, totals in dirs:
+        writer.name(name)
+        writer.delta(record)
+        writer.ints += totals
+    return writer.dump()
+
+
+def load_record(data: bytes) -> tuple[list[T_FileEntry], list[T_DirEntry], int | None]:
+    """ Read directory record. Raises ValueError for invalid blob. """
+    try:
+        reader = _Reader(data, RECORD)
+        quota = reader.int() - 1
+        quota = None if quota < 0 else quota
+        files = reader.files()
+        dirs = [(reader.name(), reader.delta(), (reader.int(), reader.int(), reader.int())) for _ in range(reader.int())]
+    except IndexError as exc:
+        raise ValueError(f"Invalid directory record: {exc}") from None
+
+    reader.check_end()
+    return files, dirs, quota
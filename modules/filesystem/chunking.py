@@ -0,0 +1,67 @@
+"""
+Content-defined chunking.
+
+Chunk boundaries are picked by a rolling (gear) hash of the content,
+not by fixed offsets, so inserting or removing bytes only moves the
+boundaries next to the change. Identical parts of different files (or
+of different versions of one file) are split into identical chunks,
+which are then stored once (see chunk index in modules.discord.data).
+"""
+import hashlib
+import base64
+
+
+KEY_SIZE = 12  # Bytes of chunk digest.
+MIN_DIV = 4    # Min chunk size = max size / MIN_DIV.
+AVG_DIV = 2    # Expected chunk size = max size / AVG_DIV.
+
+
+def _build_gear() -> list[int]:
+    """ 256 pseudo-random 64-bit values. Must never change, boundaries depend on them. """
+    return [int.from_bytes(hashlib.blake2b(bytes([i]), digest_size=8).digest(), "big") for i in range(256)]
+
+
+GEAR = _build_gear()
+_MASK_64 = (1 << 64) - 1
+
+
+def _boundary_mask(avg_size: int) -> int:
+    bits = max(avg_size.bit_length(), 1)
+    # Use the highest bits of the hash, they depend on the most recent bytes.
+    return ((1 << bits) - 1) << (64 - bits)
+
+
+def split(data: bytes, max_size: int) -> list[bytes]:
+    """ Split data into content-defined chunks of up to max_size bytes. """
+    min_size = max(max_size // MIN_DIV, 1)
+    mask = _boundary_mask(max_size // AVG_DIV - min_size)
+    gear = GEAR
+
+    chunks = []
+    start = 0
+    size = len(data)
+
+    while start < size:
+        end = min(start + max_size, size)
+        if end - start <= min_size:
+            chunks.append(data[start:end])
+            break
+
+        h = 0
+        cut = end
+        for i in range(start + min_size, end):
+            h = ((h << 1) + gear[data[i]]) & _MASK_64
+            if not h & mask:
+                cut = i + 1
+                break
+
+        chunks.append(data[start:cut])
+        start = cut
+
+    return chunks
+
+
+def chunk_key(kind: str, data: bytes) -> str:
+    """ Return key of chunk content stored as kind (codec id). """
+    digest = hashlib.blake2b(data, digest_size=KEY_SIZE, person=kind.encode()[:16]).digest()
+    return base64.urlsafe_b64encode(digest).decode().rstrip("=")
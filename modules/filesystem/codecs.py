@@ -0,0 +1,186 @@
+"""
+Chunk codecs.
+
+Codec turns raw file content into text that can be stored in message
+bodies and back. Codec id is saved per file in the struct, so files
+written with older codec can still be read.
+
+    b64  - base64 (6 bits per character). Legacy codec, chunks are
+           slices of single base64 string.
+    b32k - base32768 (15 bits per character). Every chunk is encoded
+           independently.
+    att  - not a text codec: raw bytes stored in message attachments
+           (files bigger than limits.ATTACHMENT_THRESHOLD_B).
+"""
+from modules import limits
+
+from abc import ABC, abstractmethod
+import base64
+
+
+class Codec(ABC):
+    id: str = ""
+
+    @abstractmethod
+    def encode(self, data: bytes) -> str:
+        ...
+
+    @abstractmethod
+    def decode(self, text: str) -> bytes:
+        ...
+
+    @abstractmethod
+    def max_bytes(self, n: int) -> int:
+        """ Max amount of bytes that can be encoded in n characters. """
+
+    def encode_chunks(self, data: bytes, n: int = limits.MSG_SIZE) -> list[str]:
+        """ Split data into chunks, each encoded in up to n characters. """
+        size = self.max_bytes(n)
+        return [self.encode(data[i:i + size]) for i in range(0, len(data), size)]
+
+    def decode_chunks(self, chunks: list[str]) -> bytes:
+        return b"".join(self.decode(chunk) for chunk in chunks)
+
+
+class Base64Codec(Codec):
+    id = "b64"
+
+    def encode(self, data: bytes) -> str:
+        return base64.b64encode(data).decode()
+
+    def decode(self, text: str) -> bytes:
+        return base64.b64decode(text)
+
+    def max_bytes(self, n: int) -> int:
+        return n // 4 * 3
+
+    def decode_chunks(self, chunks: list[str]) -> bytes:
+        # Legacy chunks are cut from single base64 string at any position.
+        return self.decode("".join(chunks))
+
+
+def _build_alphabet(ranges: list[tuple[int, int]]) -> str:
+    return "".join(chr(start + i) for start, amount in ranges for i in range(amount))
+
+
+def _build_lookup(alphabet: str) -> list[int]:
+    """ Code point -> value table (-1 for characters outside alphabet). """
+    lookup = [-1] * 0x10000
+    for i, char in enumerate(alphabet):
+        lookup[ord(char)] = i
+    return lookup
+
+
+class Base32768Codec(Codec):
+    """
+    Packs 15 bits into every character. Alphabets use only BMP letters which
+    are stable under unicode normalization (CJK ideographs, Hangul syllables
+    and Yi syllables for the final 7-bit character). Padding bits are set to 1
+    and incomplete bytes are dropped while decoding.
+    """
+    id = "b32k"
+
+    ALPHABET_15 = _build_alphabet([(0x4E00, 20902), (0xAC00, 11172), (0x3400, 694)])
+    ALPHABET_7 = _build_alphabet([(0xA000, 128)])
+    _LOOKUP_15 = _build_lookup(ALPHABET_15)
+    _LOOKUP_7 = _build_lookup(ALPHABET_7)
+
+    def encode(self, data: bytes) -> str:
+        alphabet = self.ALPHABET_15
+        out = []
+
+        # 15 bytes = 120 bits = 8 characters.
+        blocks_end = len(data) // 15 * 15
+        for i in range(0, blocks_end, 15):
+            block = int.from_bytes(data[i:i + 15], "big")
+            out += (
+                alphabet[block >> 105], alphabet[(block >> 90) & 0x7FFF],
+                alphabet[(block >> 75) & 0x7FFF], alphabet[(block >> 60) & 0x7FFF],
+                alphabet[(block >> 45) & 0x7FFF], alphabet[(block >> 30) & 0x7FFF],
+                alphabet[(block >> 15) & 0x7FFF], alphabet[block & 0x7FFF]
+            )
+
+        tail = data[blocks_end:]
+        if not tail:
+            return "".join(out)
+
+        value = int.from_bytes(tail, "big")
+        n_15, rest = divmod(len(tail) * 8, 15)
+        pad = 0
+        if rest > 7:
+            pad = 15 - rest
+            n_15 += 1
+            rest = 0
+        elif rest:
+            pad = 7 - rest
+            rest = 7
+
+        value = (value << pad) | ((1 << pad) - 1)
+        for i in range(n_15):
+            out.append(alphabet[(value >> (rest + 15 * (n_15 - i - 1))) & 0x7FFF])
+
+        if rest:
+            out.append(self.ALPHABET_7[value & 0x7F])
+
+        return "".join(out)
+
+    def decode(self, text: str) -> bytes:
+        try:
+            values = list(map(self._LOOKUP_15.__getitem__, map(ord, text)))
+        except IndexError:
+            raise ValueError("Invalid base32768 character (outside BMP).") from None
+
+        last_7 = -1
+        if values and values[-1] < 0:
+            last_7 = self._LOOKUP_7[ord(text[-1])]
+            values.pop()
+
+        if values and min(values) < 0:
+            raise ValueError("Invalid base32768 character.")
+
+        if last_7 < 0 and len(values) < len(text):
+            raise ValueError("Invalid base32768 final character.")
+
+        out = bytearray()
+        blocks_end = len(values) // 8 * 8
+        for i in range(0, blocks_end, 8):
+            a, b, c, d, e, f, g, h = values[i:i + 8]
+            block = (a << 105) | (b << 90) | (c << 75) | (d << 60) | (e << 45) | (f << 30) | (g << 15) | h
+            out += block.to_bytes(15, "big")
+
+        value = 0
+        bits = 0
+        tail = [(v, 15) for v in values[blocks_end:]]
+        if last_7 >= 0:
+            tail.append((last_7, 7))
+
+        for v, size in tail:
+            value = (value << size) | v
+            bits += size
+            while bits >= 8:
+                bits -= 8
+                out.append((value >> bits) & 0xFF)
+            value &= (1 << bits) - 1
+
+        return bytes(out)
+
+    def max_bytes(self, n: int) -> int:
+        size = n * 15 // 8
+        while self.__encoded_len(size) > n:
+            size -= 1
+        return size
+
+    @staticmethod
+    def __encoded_len(size: int) -> int:
+        n_15, rest = divmod(size * 8, 15)
+        return n_15 + (rest > 0)
+
+
+CODECS: dict[str, Codec] = {codec.id: codec for codec in (Base64Codec(), Base32768Codec())}
+LEGACY_CODEC = Base64Codec.id
+DEFAULT_CODEC = Base32768Codec.id
+ATTACHMENT_CODEC = "att"
+
+
+def get_codec(codec_id: str) -> Codec | None:
+    return CODECS.get(codec_id)
@@ -0,0 +1,101 @@
+"""
+Per-file content compression.
+
+Compression id is saved per file in the struct next to the codec id,
+files without it are not compressed.
+Content that is already compressed (known archive/media signatures or
+poor compression ratio of a sample) is stored as is.
+
+Smaller content is compressed in content-defined segments, each ending
+with a full flush. Compressed form of a segment does not depend on data
+before it, so a local change of content changes only a local part of
+compressed data (and only a few stored chunks). Output is a regular
+zlib stream.
+"""
+from modules.filesystem import chunking
+from modules import limits
+
+import zlib
+
+
+NO_COMPRESSION = "none"
+ZLIB = "zlib"
+DEFAULT_COMPRESSION = ZLIB
+
+SAMPLE_SIZE = 64 * 1024
+MIN_RATIO = 0.9  # Compressed data must be at least 10% smaller.
+SEGMENT_SIZE = 16 * 1024  # Max size of independently compressed segment.
+SEGMENTED_MAX_SIZE = 16 * limits.ATTACHMENT_THRESHOLD_B  # Bigger content is compressed at once.
+
+COMPRESSED_SIGNATURES = (
+    b"\x1f\x8b",              # gzip
+    b"PK\x03\x04",            # zip, docx, jar...
+    b"\x28\xb5\x2f\xfd",      # zstd
+    b"\xfd7zXZ\x00",          # xz
+    b"BZh",                   # bzip2
+    b"7z\xbc\xaf\x27\x1c",    # 7z
+    b"Rar!\x1a\x07",          # rar
+    b"\x89PNG",               # png
+    b"\xff\xd8\xff",          # jpeg
+    b"GIF8",                  # gif
+    b"RIFF",                  # webp, avi, wav
+    b"OggS",                  # ogg
+    b"fLaC",                  # flac
+    b"ID3",                   # mp3
+    b"%PDF",                  # pdf
+)
+
+
+def is_compressed(data: bytes) -> bool:
+    """ Check if data looks like already compressed content. """
+    if data.startswith(COMPRESSED_SIGNATURES):
+        return True
+
+    # mp4/mov: size + `ftyp` box.
+    if data[4:8] == b"ftyp":
+        return True
+
+    sample = data[:SAMPLE_SIZE]
+    return len(zlib.compress(sample, 1)) > len(sample) * MIN_RATIO
+
+
+def _compress_segments(data: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level)
+    parts = []
+
+    for segment in chunking.split(data, SEGMENT_SIZE):
+        parts.append(compressor.compress(segment))
+        parts.append(compressor.flush(zlib.Z_FULL_FLUSH))
+
+    parts.append(compressor.flush())
+    return b"".join(parts)
+
+
+def compress(data: bytes, level: int = limits.COMPRESSION_LEVEL) -> tuple[str, bytes]:
+    """ Returns (compression id, stored data). """
+    if not data or is_compressed(data):
+        return NO_COMPRESSION, data
+
+    if len(data) > SEGMENTED_MAX_SIZE:
+        compressed = zlib.compress(data, level)
+    else:
+        compressed = _compress_segments(data, level)
+
+    if len(compressed) > len(data) * MIN_RATIO:
+        return NO_COMPRESSION, data
+
+    return ZLIB, compressed
+
+
+def decompress(compression: str, data: bytes) -> bytes | None:
+    """ Returns original data or None if compression id is unknown. Raises ValueError for corrupted data. """
+    if compression == NO_COMPRESSION:
+        return data
+
+    if compression == ZLIB:
+        try:
+            return zlib.decompress(data)
+        except zlib.error as exc:
+            raise ValueError(f"Invalid compressed data: {exc}") from None
+
+    return None
@@ -0,0 +1,36 @@
+"""
+Directory records format.
+
+Every directory is saved as its own record listing only its entries, subdirectories
+are referenced by id of their records. Saving a change rewrites records of changed
+directories only and reading a path reads only records of directories along it.
+Records are written in binary format (see filesystem.binary) and keep totals of
+subdirectories, so sizes are known without reading them.
+"""
+from modules.filesystem.fs import FS_Dir
+from modules.filesystem import binary
+
+
+def snapshot(dir: FS_Dir) -> list[binary.T_FileEntry]:
+    """ Current values of directory's files (written later with dump). """
+    return [binary.file_entry(file) for file in dir.files]
+
+
+def dump(files: list[binary.T_FileEntry], dirs: list[binary.T_DirEntry], quota: int | None) -> bytes:
+    return binary.dump_record(files, dirs, quota)
+
+
+def load(dir: FS_Dir, data: bytes) -> None:
+    """ Insert entries of record into (not loaded) directory. Raises ValueError for invalid record. """
+    files, dirs, quota = binary.load_record(data)
+
+    children = []
+    for name, record, totals in dirs:
+        child = FS_Dir(name, None, record=record, loaded=False)
+        child.add_totals(*totals)
+        children.append(child)
+
+    # Totals saved in parent's record are replaced with counted ones.
+    dir.add_totals(-dir.total_size, -dir.files_count, -dir.dirs_count)
+    dir.quota = quota
+    binary.insert_entries(dir, files, children)
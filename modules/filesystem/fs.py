@@ -1,8 +1,11 @@
+from modules.filesystem.compression import NO_COMPRESSION
+from modules.filesystem.codecs import LEGACY_CODEC
 from modules.paths import sizeof_fmt
 
 from dataclasses import dataclass, field
 from collections.abc import Generator
 import discord
+import sys
 
 HOME_DIR = "~/"
 ILLEGAL_CHARS = "\\/:*?<>|\"~` "
@@ -24,11 +27,12 @@ def is_object_name_valid(name: str) -> bool:
 class Tokens:
     TYPE_DIR = "D"
     TYPE_FILE = "F"
+    SEP = ":"
     END_OBJ = "|"
     OUT_DIR = "?"
 
 
-@dataclass
+@dataclass(slots=True)
 class MemoryAddress:
     channel_id: int
     message_id: int
@@ -40,6 +44,11 @@ class MemoryAddress:
             message_id=message.id
         )
 
+    @staticmethod
+    def from_mem_addr(mem_addr: str) -> "MemoryAddress":
+        channel_id, message_id = mem_addr.split(":")
+        return MemoryAddress(channel_id, message_id)
+
     def __post_init__(self) -> None:
         self.channel_id = int(self.channel_id)
         self.message_id = int(self.message_id)
@@ -48,88 +57,105 @@ class MemoryAddress:
         return f"{self.channel_id}:{self.message_id}"
 
 
-@dataclass
+# Nodes are slotted (no per-instance __dict__) and compared by identity.
+@dataclass(slots=True, eq=False)
 class _FS_Obj:
     name: str
     parent_dir: "FS_Dir"
+    _cache_generation: int = field(default=-1, init=False, repr=False)  # Root's generation when cached (-1 if none).
+    _path: str = field(default="", init=False, repr=False)
+    _base: "FS_Dir | _FS_Obj" = field(default=None, init=False, repr=False)
+    _linked: bool = field(default=False, init=False, repr=False)
 
     def __post_init__(self) -> None:
+        self.name = sys.intern(self.name)
         if self.parent_dir is not None:
             if isinstance(self, FS_File):
                 self.parent_dir.insert_file(self)
             if isinstance(self, FS_Dir):
                 self.parent_dir.insert_dir(self)
 
+    def _is_cached(self) -> bool:
+        """ Check if cached values are valid (root of tree didn't change it's generation since). """
+        return self._cache_generation >= 0 and self._cache_generation == self._base.generation
+
+    def _refresh(self) -> None:
+        """ Recompute cached path, base directory and link state of this object and its stale parents. """
+        stale = []
+        obj = self
+        while obj is not None and not obj._is_cached():
+            stale.append(obj)
+            obj = obj.parent_dir
+
+        for obj in reversed(stale):
+            parent = obj.parent_dir
+            name = obj.name + "/" if isinstance(obj, FS_Dir) else obj.name
+            if parent is None:
+                obj._path, obj._base, obj._linked = name, obj, obj.name == "~"
+            else:
+                obj._path = parent._path + name
+                obj._base = parent._base
+                obj._linked = parent._linked and parent.children.get(obj.name) is obj
+            obj._cache_generation = obj._base.generation if isinstance(obj._base, FS_Dir) else -1
+
     def path_to(self) -> str:
-        ...
-        
+        """ Absolute path (directories' paths end with `/`). """
+        if not self._is_cached():
+            self._refresh()
+        return self._path
+
     def api_export(self) -> dict:
         ...
 
     def base_dir(self) -> "FS_Dir | _FS_Obj":
-        if self.parent_dir is not None:
-            return self.parent_dir.base_dir()
-        return self
+        if not self._is_cached():
+            self._refresh()
+        return self._base
 
     def remove(self) -> bool:
         if self.name == "~":
             return False
 
-        if isinstance(self, FS_File):
-            self.parent_dir.files.remove(self)
-
-        if isinstance(self, FS_Dir):
-            self.parent_dir.dirs.remove(self)
-
+        self.parent_dir.remove_child(self)
         self.parent_dir = None
         return True
 
+    def rename(self, new_name: str) -> None:
+        """ Change name (keeps parent's children index in sync). Raises ValueError if name is in use. """
+        if self.parent_dir is not None:
+            self.parent_dir.rename_child(self, new_name)
+        elif isinstance(self, FS_Dir):
+            self.generation += 1
+        self.name = sys.intern(new_name)
+
     def is_linked(self) -> bool:
         """ Check if entire path trace exists to this point. """
-        if self.name == '~':
-            return True
+        if not self._is_cached():
+            self._refresh()
+        return self._linked
 
-        trace = self.path_to().split("/")[::-1][2:]  # .., ../..
 
-        if not trace:
-            return False
-        if trace[-1] != "~":
-            return False
-
-        parent = self.parent_dir
-        child = self
-
-        for name in trace:
-            if parent.name != name:
-                return False
-
-            if child not in parent.files and child not in parent.dirs:
-                return False
-
-            child = parent
-            parent = parent.parent_dir
-
-        return True
-
-
-@dataclass
+@dataclass(slots=True, eq=False)
 class FS_File(_FS_Obj):
     mem_addr: MemoryAddress
     size: int
+    codec: str = LEGACY_CODEC
+    compression: str = NO_COMPRESSION
 
     def repr(self) -> str:
-        return f"{Tokens.TYPE_FILE}:{self.name}:{self.mem_addr.prepare_mem_addr()}:{self.size}{Tokens.END_OBJ}"
-
-    def path_to(self, t=[]) -> str:
-        t.append(self.name)
-
+        base = f"{Tokens.TYPE_FILE}:{self.name}:{self.mem_addr.prepare_mem_addr()}:{self.size}"
+        if self.codec != LEGACY_CODEC or self.compression != NO_COMPRESSION:
+            base += f"{Tokens.SEP}{self.codec}"
+        if self.compression != NO_COMPRESSION:
+            base += f"{Tokens.SEP}{self.compression}"
+        return base + Tokens.END_OBJ
+
+    def resize(self, size: int) -> None:
+        """ Change size (keeps parents' totals in sync). """
         if self.parent_dir is not None:
-            return self.parent_dir.path_to(t).removesuffix("/")
+            self.parent_dir.add_totals(size - self.size, 0, 0)
+        self.size = size
 
-        trace = t[::-1]
-        path = "/".join(trace)
-        return path
-    
     def api_export(self) -> dict:
         return {
             "type": Tokens.TYPE_FILE,
@@ -139,54 +165,139 @@ class FS_File(_FS_Obj):
         }
 
 
-@dataclass
+@dataclass(slots=True, eq=False)
 class FS_Dir(_FS_Obj):
     files: list[FS_File] = field(default_factory=list)
     dirs: list["FS_Dir"] = field(default_factory=list)
+    record: int | None = None  # Id of directory's saved record (None if not saved yet).
+    loaded: bool = True  # False until entries are read from record.
+    quota: int | None = None  # Max total size of files in subtree.
+    children: dict[str, _FS_Obj] = field(default_factory=dict, init=False, repr=False)  # name -> object (same as files and dirs)
+    # Totals of whole subtree (for not loaded directory as saved in parent's record).
+    total_size: int = field(default=0, init=False)
+    files_count: int = field(default=0, init=False)
+    dirs_count: int = field(default=0, init=False)
+    # Bumped by every change of tree's shape (insert, remove, rename) while directory is tree's root,
+    # cached paths of older generation are stale (see _FS_Obj._is_cached).
+    generation: int = field(default=0, init=False, repr=False)
 
     def __post_init__(self) -> None:
-        if self.parent_dir is not None:
-            if isinstance(self, FS_File):
-                self.parent_dir.insert_file(self)
-            if isinstance(self, FS_Dir):
-                self.parent_dir.insert_dir(self)
+        self.children = {obj.name: obj for obj in (*self.files, *self.dirs)}
+        self.total_size = sum(file.size for file in self.files) + sum(dir.total_size for dir in self.dirs)
+        self.files_count = len(self.files) + sum(dir.files_count for dir in self.dirs)
+        self.dirs_count = len(self.dirs) + sum(dir.dirs_count for dir in self.dirs)
+        _FS_Obj.__post_init__(self)  # Zero-argument super() doesn't work in slotted dataclasses.
+
+    def __insert(self, obj: _FS_Obj, objects: list) -> None:
+        current = self.children.get(obj.name)
+        if current is obj:
+            return
+        if current is not None:
+            raise ValueError(f"Name already in use: {obj.name}")
+
+        if obj.parent_dir is None:
+            obj.parent_dir = self
+        objects.append(obj)
+        self.children[obj.name] = obj
+        self.add_totals(*obj_totals(obj))
+
+        # Inserted object could be root of other tree.
+        if isinstance(obj, FS_Dir):
+            obj.generation += 1
+        obj._cache_generation = -1
+        self.touch()
 
     def insert_file(self, file: FS_File) -> None:
-        if file.parent_dir is None:
-            file.parent_dir = self
-        if file not in self.files:
-            self.files.append(file)
+        self.__insert(file, self.files)
 
     def insert_dir(self, dir: "FS_Dir") -> None:
-        if dir.parent_dir is None:
+        self.__insert(dir, self.dirs)
+
+    def insert_many(self, files: list[FS_File], dirs: list["FS_Dir"] = ()) -> None:
+        """
+        Link detached objects at once (totals are added to parents and tree is touched once, used when tree is read).
+        Raises ValueError for duplicated name.
+        """
+        children = self.children
+        size, files_count, dirs_count = 0, len(files), len(dirs)
+
+        for file in files:
+            if file.name in children:
+                raise ValueError(f"Name already in use: {file.name}")
+            children[file.name] = file
+            file.parent_dir = self
+            size += file.size
+
+        for dir in dirs:
+            if dir.name in children:
+                raise ValueError(f"Name already in use: {dir.name}")
+            children[dir.name] = dir
             dir.parent_dir = self
-        if dir not in self.dirs:
-            self.dirs.append(dir)
+            dir.generation += 1  # Inserted directory could be root of other tree.
+            dir._cache_generation = -1
+            size += dir.total_size
+            files_count += dir.files_count
+            dirs_count += dir.dirs_count
+
+        self.files += files
+        self.dirs += dirs
+        self.add_totals(size, files_count, dirs_count)
+        self.touch()
+
+    def remove_child(self, obj: _FS_Obj) -> None:
+        if self.children.get(obj.name) is not obj:
+            raise ValueError(f"Not a child of {self.name}: {obj.name}")
+
+        del self.children[obj.name]
+        objects = self.files if isinstance(obj, FS_File) else self.dirs
+        for i, item in enumerate(objects):
+            if item is obj:
+                del objects[i]
+                break
+        size, files, dirs = obj_totals(obj)
+        self.add_totals(-size, -files, -dirs)
+        self.touch()
+
+    def rename_child(self, obj: _FS_Obj, new_name: str) -> None:
+        if self.children.get(obj.name) is not obj:
+            raise ValueError(f"Not a child of {self.name}: {obj.name}")
+        if new_name in self.children:
+            raise ValueError(f"Name already in use: {new_name}")
+
+        del self.children[obj.name]
+        self.children[new_name] = obj
+        self.touch()
+
+    def touch(self) -> None:
+        """ Invalidate cached paths of tree this directory belongs to. """
+        dir = self
+        while dir.parent_dir is not None:
+            dir = dir.parent_dir
+        dir.generation += 1
+
+    def add_totals(self, size: int, files: int, dirs: int) -> None:
+        """ Add to totals of this directory and all it's parents. """
+        dir = self
+        while dir is not None:
+            dir.total_size += size
+            dir.files_count += files
+            dir.dirs_count += dirs
+            dir = dir.parent_dir
+
+    def over_quota(self, size: int) -> "FS_Dir | None":
+        """ Return first directory (from this one up to root) whose quota would be exceeded by adding size bytes. """
+        dir = self
+        while dir is not None:
+            if dir.quota is not None and dir.total_size + size > dir.quota:
+                return dir
+            dir = dir.parent_dir
+        return None
 
     def has_object(self, name: str) -> bool:
-        for d in self.dirs:
-            if d.name == name:
-                return True
-
-        for f in self.files:
-            if f.name == name:
-                return True
-
-        return False
-
-    def path_to(self, t=[]) -> str:
-        t.append(self.name)
-
-        if self.parent_dir is not None:
-            return self.parent_dir.path_to(t)
-
-        trace = t[::-1]
-        path = "/".join(trace)
-        t.clear()
-        return path + "/"
+        return name in self.children
 
     def draw_tree(self, _depth: int = 0, _buff: str = "") -> str:
-        _buff += f"{'| ' * _depth}[{self.name}]\n"
+        _buff += f"{'| ' * _depth}[{self.name}] ({sizeof_fmt(self.total_size)})\n"
 
         d = '| ' * (_depth + 1)
         for file in self.files:
@@ -202,6 +313,10 @@ class FS_Dir(_FS_Obj):
             "type": Tokens.TYPE_DIR,
             "name": self.name,
             "path": self.path_to(),
+            "size": self.total_size,
+            "files_count": self.files_count,
+            "dirs_count": self.dirs_count,
+            "quota": self.quota,
             "files": [],
             "dirs": [] 
         }
@@ -215,16 +330,19 @@ class FS_Dir(_FS_Obj):
         return this_data
         
     def export(self) -> str:
-        base = f"{Tokens.TYPE_DIR}:{self.name}{Tokens.END_OBJ}"
+        """ Text format of whole tree (see filesystem.binary for compact one). """
+        parts = []
+        self.__export(parts)
+        return "".join(parts)
 
-        for file in self.files:
-            base += file.repr()
+    def __export(self, parts: list[str]) -> None:
+        parts.append(f"{Tokens.TYPE_DIR}:{self.name}{Tokens.END_OBJ}")
+        parts.extend(file.repr() for file in self.files)
 
         for dir in self.dirs:
-            base += dir.export()
+            dir.__export(parts)
 
-        base += f"{Tokens.OUT_DIR}"
-        return base
+        parts.append(Tokens.OUT_DIR)
 
     def move_to(self, rel_path: str) -> _FS_Obj | None:
         """ Returns FS_Dir or FS_File at given relative path. None if invalid. """
@@ -249,19 +367,13 @@ class FS_Dir(_FS_Obj):
 
             if part == "..":
                 cwd = cwd.parent_dir
+                if cwd is None:
+                    return None
                 continue
 
-            for d in cwd.dirs:
-                if d.name == part:
-                    cwd = d
-                    break
-            else:
-                for f in cwd.files:
-                    if f.name == part:
-                        cwd = f
-                        break
-                else:
-                    return None
+            cwd = cwd.children.get(part)
+            if cwd is None:
+                return None
 
         return cwd
 
@@ -275,3 +387,10 @@ class FS_Dir(_FS_Obj):
 
             for item in dir.walk(file_only=file_only):
                 yield item
+
+
+def obj_totals(obj: _FS_Obj) -> tuple[int, int, int]:
+    """ Size, files count and directories count added to parent's totals by object. """
+    if isinstance(obj, FS_File):
+        return obj.size, 1, 0
+    return obj.total_size, obj.files_count, obj.dirs_count + 1
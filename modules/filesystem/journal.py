@@ -0,0 +1,136 @@
+"""
+Files structure journal format.
+
+Tree mutations are saved as small records appended after the latest
+checkpoint (directory records, see filesystem.dir_records) instead of rewriting
+changed directories at once. Replaying records on the checkpoint gives the
+current tree. Records of one commit
+are separated with `|`, paths are absolute (names can't contain `:` or
+`|`, see fs.ILLEGAL_CHARS):
+    D:~/a/b                                   make directory
+    F:~/a/f:ch:msg:size:codec:compression     create or update file
+    R:~/a/f                                   remove object
+    N:~/a/f:new_name                          rename object
+    Q:~/a:quota                               set directory's quota (no value to remove it)
+"""
+from modules.filesystem.fs import FS_Dir, FS_File, _FS_Obj, Tokens, MemoryAddress
+from modules import limits
+
+
+RECORD_SEP = Tokens.END_OBJ
+MAKE_DIR = "D"
+PUT_FILE = "F"
+REMOVE = "R"
+RENAME = "N"
+SET_QUOTA = "Q"
+
+
+def make_dir(path: str) -> str:
+    return f"{MAKE_DIR}{Tokens.SEP}{path.removesuffix('/')}"
+
+
+def put_file(path: str, file: FS_File) -> str:
+    fields = [path.removesuffix("/"), file.mem_addr.prepare_mem_addr(), str(file.size), file.codec, file.compression]
+    return f"{PUT_FILE}{Tokens.SEP}" + Tokens.SEP.join(fields)
+
+
+def remove(path: str) -> str:
+    return f"{REMOVE}{Tokens.SEP}{path.removesuffix('/')}"
+
+
+def rename(path: str, new_name: str) -> str:
+    return f"{RENAME}{Tokens.SEP}{path.removesuffix('/')}{Tokens.SEP}{new_name}"
+
+
+def set_quota(path: str, quota: int | None) -> str:
+    return f"{SET_QUOTA}{Tokens.SEP}{path.removesuffix('/')}{Tokens.SEP}{'' if quota is None else quota}"
+
+
+def pack(records: list[str], n: int = limits.MSG_SIZE) -> list[str]:
+    """ Pack records into bodies, each no longer than n characters. """
+    bodies = []
+    body = ""
+
+    for record in records:
+        if body and len(body) + len(record) + 1 > n:
+            bodies.append(body)
+            body = ""
+
+        body = f"{body}{RECORD_SEP}{record}" if body else record
+
+    if body:
+        bodies.append(body)
+
+    return bodies
+
+
+def unpack(body: str) -> list[str]:
+    return [record for record in body.split(RECORD_SEP) if record]
+
+
+def split_path(path: str) -> tuple[str, str]:
+    """ Split absolute path into parent directory's path and name. """
+    parent, _, name = path.rpartition("/")
+    return parent or "~", name
+
+
+def target(record: str) -> tuple[str, str]:
+    """ Return kind and path of object changed by record. """
+    kind, _, body = record.partition(Tokens.SEP)
+    return kind, body.split(Tokens.SEP, 1)[0]
+
+
+def apply(struct: FS_Dir, record: str) -> tuple[FS_Dir, _FS_Obj | None]:
+    """
+    Apply single record to tree. Returns changed directory and removed object (if any).
+    Raises ValueError for invalid record.
+    """
+    kind, _, body = record.partition(Tokens.SEP)
+    path, *fields = body.split(Tokens.SEP)
+    if kind == SET_QUOTA and len(fields) == 1:
+        target = struct.move_to(path)
+        if not isinstance(target, FS_Dir):
+            raise ValueError(f"Invalid journal path: {path}")
+        target.quota = int(fields[0]) if fields[0] else None
+        return target, None
+
+    parent_path, name = split_path(path)
+
+    parent = struct.move_to(parent_path)
+    if not isinstance(parent, FS_Dir) or not name:
+        raise ValueError(f"Invalid journal path: {path}")
+
+    if kind == MAKE_DIR and not fields:
+        if parent.has_object(name):
+            raise ValueError(f"Object already exists: {path}")
+        FS_Dir(name, parent)
+        return parent, None
+
+    if kind == PUT_FILE and len(fields) == 5:
+        channel_id, message_id, size, codec, compression = fields
+        mem_addr = MemoryAddress(channel_id, message_id)
+
+        file = parent.children.get(name)
+        if isinstance(file, FS_File):
+            file.mem_addr, file.codec, file.compression = mem_addr, codec, compression
+            file.resize(int(size))
+            return parent, None
+
+        if file is not None:
+            raise ValueError(f"Object already exists: {path}")
+        FS_File(name, parent, mem_addr, int(size), codec, compression)
+        return parent, None
+
+    target = parent.children.get(name)
+    if target is None:
+        raise ValueError(f"Invalid journal path: {path}")
+
+    if kind == REMOVE and not fields:
+        target.remove()
+        return parent, target
+
+    if kind == RENAME and len(fields) == 1:
+        target.rename(fields[0])
+        return parent, None
+
+    raise ValueError(f"Invalid journal record: {record}")
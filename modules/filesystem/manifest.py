@@ -0,0 +1,70 @@
+"""
+Chunk manifest format.
+
+A manifest is an ordered list of every chunk address of a file.
+It is stored in one or more data messages (`#body@next`), the file's
+memory address points to the first one. Within a body entries are
+separated with `,` and the channel id is written only when it differs
+from the previous entry:
+    #ch:msg,msg,msg,ch2:msg@END
+"""
+from modules.filesystem.fs import MemoryAddress
+from modules import limits
+
+
+MANIFEST_PREFIX = "#"
+ENTRY_SEP = ","
+ADDR_SEP = ":"
+
+
+def is_manifest(content: str) -> bool:
+    return content.startswith(MANIFEST_PREFIX)
+
+
+def pack(addresses: list[MemoryAddress], n: int = limits.MSG_SIZE) -> list[str]:
+    """ Pack addresses into manifest bodies, each no longer than n characters. """
+    bodies = []
+    entries = []
+    size = 0
+    last_channel = None
+
+    for addr in addresses:
+        entry = str(addr.message_id)
+        if addr.channel_id != last_channel:
+            entry = f"{addr.channel_id}{ADDR_SEP}{entry}"
+
+        if entries and size + len(entry) + 1 > n:
+            bodies.append(ENTRY_SEP.join(entries))
+            entries = []
+            size = 0
+            entry = f"{addr.channel_id}{ADDR_SEP}{addr.message_id}"
+
+        entries.append(entry)
+        size += len(entry) + 1
+        last_channel = addr.channel_id
+
+    if entries or not bodies:
+        bodies.append(ENTRY_SEP.join(entries))
+
+    return [MANIFEST_PREFIX + body for body in bodies]
+
+
+def unpack(body: str) -> list[MemoryAddress]:
+    """ Read addresses from single manifest body (with or without prefix). """
+    body = body.removeprefix(MANIFEST_PREFIX)
+    addresses = []
+    channel_id = None
+
+    for entry in body.split(ENTRY_SEP):
+        if not entry:
+            continue
+
+        if ADDR_SEP in entry:
+            channel_id, entry = entry.split(ADDR_SEP)
+
+        if channel_id is None:
+            raise ValueError(f"Manifest entry without channel: {entry}")
+
+        addresses.append(MemoryAddress(channel_id, entry))
+
+    return addresses
@@ -1,31 +1,35 @@
 from modules.filesystem.fs import FS_Dir, FS_File, _FS_Obj, Tokens, MemoryAddress
+from modules.filesystem.compression import NO_COMPRESSION
+from modules.filesystem.codecs import LEGACY_CODEC
 
 from typing import Optional
+import sys
 
 
 TYPE_TOKENS = [Tokens.TYPE_DIR, Tokens.TYPE_FILE]
 
 
 class Parser:
-    def __init__(self, raw: str) -> None:
+    """ Single pass parser of text tree export (see FS_Dir.export). Accepts text or utf-8 encoded bytes. """
+    def __init__(self, raw: str | bytes) -> None:
+        if isinstance(raw, (bytes, bytearray, memoryview)):
+            raw = bytes(raw).decode()
+
         self.raw = raw
         self.top: FS_Dir | None = None
-        self.total_objects = self.raw.count(Tokens.END_OBJ)
-
-    def __execute_ptr_cmds(self) -> None:
-        """ Execeute all increment pointer commands from content's start. """
-        while self.raw and self.raw[0] == Tokens.OUT_DIR:
-            self.raw = self.raw[1:]
-
-            if self.top.parent_dir is not None:
-                self.top = self.top.parent_dir
+        self.parents: list[FS_Dir | None] = []  # Parents of open directories.
+        self.entries: list[tuple[list[FS_File], list[FS_Dir]]] = []  # Read files and subdirectories of open directories.
+        self.channels: dict[int, int] = {}  # Files share channel id objects.
 
-    def __parse_part(self, part: str) -> list[str, int, int, Optional[int]]:
+    def __parse_part(self, part: str) -> list[str, int, int, Optional[int], Optional[str], Optional[str]]:
         t = part[0]
 
         if t == Tokens.TYPE_FILE:
-            _, name, channel_id, head_id, size = part.split(":")
-            return name, int(channel_id), int(head_id), int(size)
+            _, name, channel_id, head_id, size, *extra = part.split(Tokens.SEP)
+            codec = sys.intern(extra[0]) if extra else LEGACY_CODEC
+            compression = sys.intern(extra[1]) if len(extra) > 1 else NO_COMPRESSION
+            channel_id = int(channel_id)
+            return name, self.channels.setdefault(channel_id, channel_id), int(head_id), int(size), codec, compression
 
         if t == Tokens.TYPE_DIR:
             _, name = part.split(":")
@@ -33,35 +37,59 @@ class Parser:
 
         raise ValueError(f"Cannot parse part: {part}")
 
-    def __parse_single(self) -> _FS_Obj:
-        self.__execute_ptr_cmds()
-
-        type_char = self.raw[0]
-        if type_char not in TYPE_TOKENS:
-            raise ValueError(f"Invalid typechar {type_char}")
-
-        if type_char == Tokens.TYPE_FILE:
-            file_data, tail = self.raw.split(Tokens.END_OBJ, 1)
-            self.raw = tail
-
-            name, ch, head, size = self.__parse_part(file_data)
-            mem = MemoryAddress(ch, head)
-            return FS_File(name, self.top, mem, size)
-
-        if type_char == Tokens.TYPE_DIR:
-            dir_data, tail = self.raw.split(Tokens.END_OBJ, 1)
-            self.raw = tail
-
-            name = self.__parse_part(dir_data)
-            dir_obj = FS_Dir(name, self.top)
-            self.top = dir_obj
-            return dir_obj
+    def __close(self) -> None:
+        # Directory's entries are linked at once when it's read and directory itself is linked to parent after,
+        # so totals of whole subtree are counted once.
+        dir, self.top = self.top, self.parents.pop()
+        dir.insert_many(*self.entries.pop())
+        if self.entries:
+            self.entries[-1][1].append(dir)
 
     def parse(self) -> _FS_Obj:
-        base_object = self.__parse_single()
-
-        for _ in range(self.total_objects - 1):
-            self.__parse_single()
+        raw = self.raw
+        size = len(raw)
+        pos = 0
+        base_object = None
+
+        while pos < size:
+            type_char = raw[pos]
+
+            # Move out of current directory.
+            if type_char == Tokens.OUT_DIR:
+                if len(self.parents) > 1:
+                    self.__close()
+                pos += 1
+                continue
+
+            if type_char not in TYPE_TOKENS:
+                raise ValueError(f"Invalid typechar {type_char}")
+
+            end = raw.find(Tokens.END_OBJ, pos)
+            if end < 0:
+                raise ValueError(f"Unterminated object at {pos}")
+
+            part = raw[pos:end]
+            pos = end + 1
+
+            if type_char == Tokens.TYPE_FILE:
+                name, ch, head, file_size, codec, compression = self.__parse_part(part)
+                obj = FS_File(name, None, MemoryAddress(ch, head), file_size, codec, compression)
+                if self.entries:
+                    self.entries[-1][0].append(obj)
+            else:
+                obj = FS_Dir(self.__parse_part(part), None)
+                self.parents.append(self.top)
+                self.entries.append(([], []))
+                self.top = obj
+
+            if base_object is None:
+                base_object = obj
+
+        if base_object is None:
+            raise ValueError("Empty files structure.")
+
+        while self.parents:
+            self.__close()
 
         return base_object
 
@@ -5,5 +5,13 @@ MAX_BUCKETS = 30
 MSG_SIZE = 1950  # 50 for header
 TOTAL_CHANNEL_CONTENT_SIZE = MSG_SIZE * MIN_MSG_PER_CHANNEL  # 694980 (* total channel = 1Gb)
 DISCORD_FILE_SIZE_B = 10 * 1000 * 1000  # 10MiB
+ATTACHMENT_THRESHOLD_B = 64 * 1024  # Bigger files are stored in attachments.
+COMPRESSION_LEVEL = 6  # zlib level (1-9) for files content.
+MAX_FETCH_CONCURRENCY = 8  # Parallel chunk fetches per read.
+HISTORY_WINDOW = 100  # Max messages per single channel history call.
+CHUNK_POOL_SIZE = 64  # Freed messages kept for reuse (pool is trimmed to half above it).
+REBUILD_CONCURRENCY = 4  # Channels read in parallel while (re)building bucket caches.
+STRUCT_JOURNAL_SIZE = 32  # Journal messages written before next files structure checkpoint.
+CACHE_FLUSH_DELAY = 5  # Seconds of bucket cache changes coalesced into single save.
 
 MAX_ACCESS_TOKENS = 3
\ No newline at end of file
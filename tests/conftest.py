@@ -0,0 +1,34 @@
+from modules.filesystem.fs import FS_Dir, FS_File, MemoryAddress
+from modules.paths import Path
+from modules.discord import data
+from modules import logs
+
+from types import SimpleNamespace
+import fakes
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def logs_path(tmp_path, monkeypatch) -> None:
+    """ Logs are written to test's temporary directory. """
+    monkeypatch.setattr(logs, "LOGS_PATH", Path(str(tmp_path)) // "")
+
+
+@pytest.fixture
+def bot(monkeypatch) -> SimpleNamespace:
+    """ Client's user (author of fake messages). """
+    monkeypatch.setattr(data, "client", SimpleNamespace(user=fakes.BOT))
+    return fakes.BOT
+
+
+@pytest.fixture
+def tree() -> FS_Dir:
+    """ Files structure: `~/docs/{a.txt, zażółć.md, empty/, sub/deep/b.txt}` and `~/b.bin`. """
+    root = FS_Dir("~", None)
+    docs = FS_Dir("docs", root)
+    FS_File("a.txt", docs, MemoryAddress(10**18, 10**18 + 5), 5)
+    FS_File("zażółć.md", docs, MemoryAddress(10**18, 10**18 + 1), 0, "b32k", "zlib")
+    FS_Dir("empty", docs)
+    FS_File("b.txt", FS_Dir("deep", FS_Dir("sub", docs)), MemoryAddress(2, 11), 6, "b32k", "zlib")
+    FS_File("b.bin", root, MemoryAddress(2 * 10**18, 7), 10**10, "att", "none")
+    return root
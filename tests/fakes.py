@@ -0,0 +1,195 @@
+"""
+In-memory discord objects for tests of code talking to discord (data channels, meta and struct channels).
+Channels keep their messages by id (ids grow in order of sending across the whole guild) and
+can be told to fail next operations (see FakeChannel.fail).
+"""
+from modules.discord.data import DriveGuild, MemoryManager
+from modules.filesystem import binary
+from modules.filesystem import fs
+
+from types import SimpleNamespace
+import itertools
+import discord
+import base64
+
+
+BOT = SimpleNamespace(id=1, name="bot")
+_ids = itertools.count(10**6)
+
+
+def http_error(status: int = 500) -> discord.HTTPException:
+    response = SimpleNamespace(status=status, reason="Not Found" if status == 404 else "Server Error")
+    if status == 404:
+        return discord.NotFound(response, "")
+    return discord.HTTPException(response, "")
+
+
+class FakeAttachment:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.size = len(data)
+
+    async def read(self) -> bytes:
+        return self.data
+
+
+class FakeMessage(discord.Message):
+    def __init__(self, channel: "FakeChannel", content: str, attachments: list[FakeAttachment] = ()) -> None:
+        self.id = next(_ids)
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.author = BOT
+        self.attachments = list(attachments)
+
+    def __repr__(self) -> str:
+        return f"<FakeMessage id={self.id} content={self.content[:20]!r}>"
+
+    async def edit(self, *, content: str) -> "FakeMessage":
+        self.channel.check("edit")
+        self.content = content
+        return self
+
+    async def delete(self) -> None:
+        self.channel.check("delete")
+        if self.channel.messages.pop(self.id, None) is None:
+            raise http_error(404)
+
+    async def fetch(self) -> "FakeMessage":
+        return await self.channel.fetch_message(self.id)
+
+
+class _PartialMessage:
+    def __init__(self, channel: "FakeChannel", message_id: int) -> None:
+        self.channel = channel
+        self.id = message_id
+
+    def __message(self) -> FakeMessage:
+        message = self.channel.messages.get(self.id)
+        if message is None:
+            raise http_error(404)
+        return message
+
+    async def fetch(self) -> FakeMessage:
+        return self.__message()
+
+    async def edit(self, *, content: str) -> FakeMessage:
+        return await self.__message().edit(content=content)
+
+    async def delete(self) -> None:
+        await self.__message().delete()
+
+
+class FakeChannel(discord.TextChannel):
+    category = None  # Plain attribute instead of discord's property.
+
+    def __init__(self, guild: "FakeGuild", name: str, category: "FakeCategory | None" = None) -> None:
+        self.id = next(_ids)
+        self.name = name
+        self.guild = guild
+        self.category = category
+        self.messages: dict[int, FakeMessage] = {}
+        self.failures: dict[str, list[int]] = {}  # operation (send, edit, delete) -> [calls to pass first, calls to fail]
+        guild.channels[self.id] = self
+
+    def __repr__(self) -> str:
+        return f"<FakeChannel name={self.name}>"
+
+    def fail(self, operation: str, times: int = 1, after: int = 0) -> None:
+        """ Make next calls of operation (after given amount of successful ones) raise HTTPException. """
+        self.failures[operation] = [after, times]
+
+    def check(self, operation: str) -> None:
+        counts = self.failures.get(operation)
+        if counts is None:
+            return
+        if counts[0] > 0:
+            counts[0] -= 1
+        elif counts[1] > 0:
+            counts[1] -= 1
+            raise http_error()
+
+    async def send(self, content: str = "", *, file: discord.File | None = None) -> FakeMessage:
+        self.check("send")
+        attachments = [FakeAttachment(file.fp.read())] if file is not None else []
+        message = FakeMessage(self, content, attachments)
+        self.messages[message.id] = message
+        return message
+
+    async def fetch_message(self, message_id: int) -> FakeMessage:
+        message = self.messages.get(message_id)
+        if message is None:
+            raise http_error(404)
+        return message
+
+    def get_partial_message(self, message_id: int) -> _PartialMessage:
+        return _PartialMessage(self, message_id)
+
+    async def history(self, *, limit: int | None = 100, before=None, after=None, oldest_first: bool | None = None):
+        ids = sorted(self.messages, reverse=not (after is not None if oldest_first is None else oldest_first))
+        ids = [i for i in ids if (after is None or i > after.id) and (before is None or i < before.id)]
+        for message_id in ids[:limit]:
+            if message_id in self.messages:
+                yield self.messages[message_id]
+
+
+class FakeCategory(discord.CategoryChannel):
+    text_channels = None  # Plain attribute instead of discord's property.
+
+    def __init__(self, guild: "FakeGuild", name: str) -> None:
+        self.id = next(_ids)
+        self.name = name
+        self.guild = guild
+        self.text_channels: list[FakeChannel] = []
+
+    def __repr__(self) -> str:
+        return f"<FakeCategory name={self.name}>"
+
+    async def create_text_channel(self, name: str, **_) -> FakeChannel:
+        channel = FakeChannel(self.guild, name, self)
+        self.text_channels.append(channel)
+        return channel
+
+
+class FakeGuild:
+    def __init__(self, name: str = "guild") -> None:
+        self.id = next(_ids)
+        self.name = name
+        self.categories: list[FakeCategory] = []
+        self.channels: dict[int, FakeChannel] = {}
+
+    def get_channel(self, channel_id: int) -> FakeChannel | None:
+        return self.channels.get(channel_id)
+
+    async def create_category(self, name: str, **_) -> FakeCategory:
+        category = FakeCategory(self, name)
+        self.categories.append(category)
+        return category
+
+    def messages(self) -> dict[int, FakeMessage]:
+        """ All messages of guild's channels. """
+        return {i: msg for channel in self.channels.values() for i, msg in channel.messages.items()}
+
+
+async def data_guild(buckets: int = 1, channels: int = 2) -> tuple[FakeGuild, FakeCategory]:
+    """ Guild with meta category and data buckets (`data_N` categories with channels `0`..`channels - 1`). """
+    guild = FakeGuild()
+    meta = await guild.create_category("meta")
+    for index in range(buckets):
+        category = await guild.create_category(f"data_{index}")
+        for name in range(channels):
+            await category.create_text_channel(str(name))
+
+    return guild, meta
+
+
+async def drive_guild(buckets: int = 1, channels: int = 2, tree: fs.FS_Dir | None = None) -> DriveGuild:
+    """ Drive of data guild (see data_guild) with files structure saved as legacy tree (blank by default). """
+    guild, meta = await data_guild(buckets, channels)
+    logs = await meta.create_text_channel("logs")
+    struct = await meta.create_text_channel("struct")
+    console = await meta.create_text_channel("console")
+    await struct.send(base64.b64encode(binary.dump_tree(tree or fs.FS_Dir("~", None))).decode())
+
+    manager = await MemoryManager.init(guild, meta)
+    return DriveGuild(guild, logs, struct, console, None, None, manager)
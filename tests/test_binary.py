@@ -0,0 +1,53 @@
+from modules.filesystem.fs import FS_Dir
+from modules.filesystem import binary
+
+import pytest
+
+
+def test_tree_round_trip(tree: FS_Dir) -> None:
+    data = binary.dump_tree(tree)
+    assert binary.is_binary(data)
+    loaded = binary.load_tree(data)
+    assert loaded.export() == tree.export()
+    assert (loaded.total_size, loaded.files_count, loaded.dirs_count) == (10**10 + 11, 4, 4)
+
+
+def test_record_round_trip(tree: FS_Dir) -> None:
+    docs = tree.move_to("docs")
+    files = [binary.file_entry(file) for file in docs.files]
+    dirs = [("empty", 10**18 + 100, (0, 0, 0)), ("sub", 3, (6, 1, 1))]
+
+    assert binary.load_record(binary.dump_record(files, dirs, 10**12)) == (files, dirs, 10**12)
+    assert binary.load_record(binary.dump_record(files, dirs, 0)) == (files, dirs, 0)
+    assert binary.load_record(binary.dump_record([], [])) == ([], [], None)
+
+
+def test_text_is_not_binary(tree: FS_Dir) -> None:
+    assert not binary.is_binary(tree.export().encode())
+    assert not binary.is_binary(b"")
+
+
+def test_invalid_blobs(tree: FS_Dir) -> None:
+    data = binary.dump_tree(tree)
+    record = binary.dump_record([], [])
+
+    for invalid in [data[:-3], data + b"x", bytes([data[0], binary.VERSION + 1]) + data[2:], record]:
+        with pytest.raises(ValueError):
+            binary.load_tree(invalid)
+
+    with pytest.raises(ValueError):
+        binary.load_record(data)
+
+
+def test_insert_entries_links_once(tree: FS_Dir) -> None:
+    docs = tree.move_to("docs")
+    entry = binary.file_entry(docs.move_to("a.txt"))
+    dir = FS_Dir("copy", None)
+    sub = FS_Dir("sub", None)
+    binary.insert_entries(sub, [entry])
+    binary.insert_entries(dir, [entry], [sub])
+    assert (dir.total_size, dir.files_count, dir.dirs_count) == (10, 2, 1)
+    assert dir.move_to("sub/a.txt").path_to() == "copy/sub/a.txt"
+
+    with pytest.raises(ValueError):
+        binary.insert_entries(FS_Dir("dup", None), [entry, entry])
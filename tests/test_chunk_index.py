@@ -0,0 +1,108 @@
+from modules.discord.data import MemoryManager, _ChunkIndex, _ChunkPool, _RecordPages
+from modules.filesystem import codecs
+
+from dataclasses import dataclass, field
+import itertools
+import asyncio
+
+
+@dataclass
+class FakeChannel:
+    id: int
+
+
+@dataclass
+class FakeMessage:
+    id: int
+    channel: FakeChannel
+    content: str = ""
+    attachments: list = field(default_factory=list)
+
+
+class FakeMemoryManager(MemoryManager):
+    """ Memory manager sending chunks to in-memory channel (every send yields to other tasks). """
+    def __init__(self) -> None:
+        super().__init__(None, {}, _ChunkIndex(_RecordPages(None)), _ChunkPool(_RecordPages(None)))
+        self.channel = FakeChannel(1)
+        self.ids = itertools.count(100)
+        self.messages: dict[int, FakeMessage] = {}
+        self.freed: list[int] = []
+
+    async def reserve_memory(self, size: int):
+        return None
+
+    async def allocate_memory_chunk(self, size, content, file=None, reservation=None):
+        await asyncio.sleep(0)
+        message = FakeMessage(next(self.ids), self.channel, content)
+        self.messages[message.id] = message
+        return message
+
+    async def _free_message(self, message) -> None:
+        self.freed.append(message.id)
+        self.messages.pop(message.id, None)
+
+
+def message(message_id: int) -> FakeMessage:
+    return FakeMessage(message_id, FakeChannel(1))
+
+
+def test_acquire_and_release_count_references() -> None:
+    index = _ChunkIndex(_RecordPages(None))
+    assert index.acquire("k") is None
+
+    index.add("k", message(5), 2)
+    assert index.acquire("k").message_id == 5
+    assert index.refs(5) == 3
+
+    assert index.release(5) == 2
+    assert index.release(5) == 1
+    assert index.release(5) == 0
+    assert index.refs(5) == 0
+    assert "k" not in index.entries
+    assert index.release(5) == 0  # Not indexed anymore.
+
+
+def test_add_of_stored_key_keeps_stored_chunk() -> None:
+    index = _ChunkIndex(_RecordPages(None))
+    assert index.add("k", message(5), 1).message_id == 5
+
+    address = index.add("k", message(6), 2)
+    assert address.message_id == 5
+    assert index.refs(5) == 3
+    assert index.refs(6) == 0
+
+
+def test_index_is_read_from_records() -> None:
+    pages = _RecordPages(None)
+    index = _ChunkIndex(pages)
+    index.add("k", message(5), 2)
+
+    loaded = _ChunkIndex(_RecordPages(None))
+    loaded.pages.records.update(pages.records)
+    loaded = _ChunkIndex(loaded.pages)
+    assert loaded.refs(5) == 2
+
+
+def test_concurrent_writes_of_same_content_share_chunks() -> None:
+    manager = FakeMemoryManager()
+    pieces = [b"first chunk", b"second chunk"]
+
+    async def main():
+        return await asyncio.gather(
+            manager.store_chunks(codecs.DEFAULT_CODEC, pieces),
+            manager.store_chunks(codecs.DEFAULT_CODEC, pieces)
+        )
+
+    first, second = asyncio.run(main())
+    assert first == second
+    assert len(manager.freed) == 2  # Duplicates sent by the second write.
+
+    for address in first:
+        assert manager.chunk_index.refs(address.message_id) == 2
+        assert address.message_id in manager.messages
+
+    # Releasing one file keeps chunks of the other.
+    for address in first:
+        assert manager.chunk_index.release(address.message_id) == 1
+    for address in second:
+        assert manager.chunk_index.refs(address.message_id) == 1
@@ -0,0 +1,32 @@
+from modules.filesystem import chunking
+
+import random
+
+
+def test_chunks_join_into_data() -> None:
+    data = random.Random(0).randbytes(100_000)
+    chunks = chunking.split(data, 1000)
+    assert b"".join(chunks) == data
+    assert all(len(chunk) <= 1000 for chunk in chunks)
+    assert all(len(chunk) >= 250 for chunk in chunks[:-1])
+
+
+def test_insertion_moves_only_nearby_boundaries() -> None:
+    data = random.Random(1).randbytes(100_000)
+    changed = data[:50_000] + b"inserted" + data[50_000:]
+
+    old = chunking.split(data, 1000)
+    new = chunking.split(changed, 1000)
+    shared = set(old) & set(new)
+    assert len(shared) >= len(old) - 3
+
+
+def test_small_data() -> None:
+    assert chunking.split(b"", 1000) == []
+    assert chunking.split(b"abc", 1000) == [b"abc"]
+
+
+def test_chunk_key_depends_on_content_and_kind() -> None:
+    assert chunking.chunk_key("b32k", b"abc") == chunking.chunk_key("b32k", b"abc")
+    assert chunking.chunk_key("b32k", b"abc") != chunking.chunk_key("b32k", b"abd")
+    assert chunking.chunk_key("b32k", b"abc") != chunking.chunk_key("att", b"abc")
@@ -0,0 +1,64 @@
+from modules.filesystem import codecs
+
+import pytest
+import random
+
+
+SIZES = [0, 1, 2, 7, 8, 14, 15, 16, 29, 30, 31, 100, 1000]
+
+
+def data(size: int, seed: int = 0) -> bytes:
+    return random.Random(seed).randbytes(size)
+
+
+@pytest.mark.parametrize("codec_id", [codecs.LEGACY_CODEC, codecs.DEFAULT_CODEC])
+@pytest.mark.parametrize("size", SIZES)
+def test_round_trip(codec_id: str, size: int) -> None:
+    codec = codecs.get_codec(codec_id)
+    raw = data(size, size)
+    assert codec.decode(codec.encode(raw)) == raw
+
+
+@pytest.mark.parametrize("codec_id", [codecs.LEGACY_CODEC, codecs.DEFAULT_CODEC])
+def test_chunks_fit_in_message(codec_id: str) -> None:
+    codec = codecs.get_codec(codec_id)
+    raw = data(20000)
+
+    chunks = codec.encode_chunks(raw)
+    assert all(len(chunk) <= 1950 for chunk in chunks)
+    assert codec.decode_chunks(chunks) == raw
+
+
+@pytest.mark.parametrize("n", range(1, 40))
+def test_max_bytes_fit_in_n_characters(n: int) -> None:
+    codec = codecs.get_codec(codecs.DEFAULT_CODEC)
+    size = codec.max_bytes(n)
+    assert len(codec.encode(bytes(size))) <= n
+    assert len(codec.encode(bytes(size + 1))) > n
+
+
+def test_base32768_is_denser_than_base64() -> None:
+    raw = data(1000)
+    assert len(codecs.get_codec(codecs.DEFAULT_CODEC).encode(raw)) < len(codecs.get_codec(codecs.LEGACY_CODEC).encode(raw)) // 2
+
+
+def test_legacy_chunks_are_slices_of_single_string() -> None:
+    codec = codecs.get_codec(codecs.LEGACY_CODEC)
+    raw = data(100)
+    text = codec.encode(raw)
+    assert codec.decode_chunks([text[:7], text[7:50], text[50:]]) == raw
+
+
+@pytest.mark.parametrize("text", ["abc", "\U0001F600", "一" * 3 + "a"])
+def test_base32768_rejects_invalid_characters(text: str) -> None:
+    with pytest.raises(ValueError):
+        codecs.get_codec(codecs.DEFAULT_CODEC).decode(text)
+
+
+def test_unknown_codec() -> None:
+    assert codecs.get_codec("b85") is None
+
+
+def test_codec_is_abstract() -> None:
+    with pytest.raises(TypeError):
+        codecs.Codec()
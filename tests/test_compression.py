@@ -0,0 +1,70 @@
+from modules.filesystem import compression
+from modules import limits
+
+import pytest
+import random
+import zlib
+
+
+def text(size: int, seed: int = 0) -> bytes:
+    words = [b"drive", b"chunk", b"message", b"channel", b"guild", b"file", b"\n"]
+    rng = random.Random(seed)
+    out = bytearray()
+    while len(out) < size:
+        out += rng.choice(words) + b" "
+    return bytes(out[:size])
+
+
+def test_round_trip() -> None:
+    raw = text(100_000)
+    compression_id, stored = compression.compress(raw)
+    assert compression_id == compression.ZLIB
+    assert len(stored) < len(raw)
+    assert compression.decompress(compression_id, stored) == raw
+
+
+def test_round_trip_of_content_compressed_at_once() -> None:
+    raw = text(compression.SEGMENTED_MAX_SIZE + 1)
+    compression_id, stored = compression.compress(raw)
+    assert compression_id == compression.ZLIB
+    assert compression.decompress(compression_id, stored) == raw
+
+
+def test_segments_form_regular_zlib_stream() -> None:
+    raw = text(10 * compression.SEGMENT_SIZE)
+    _, stored = compression.compress(raw)
+    assert zlib.decompress(stored) == raw
+
+
+def test_local_change_keeps_rest_of_compressed_data() -> None:
+    raw = text(limits.ATTACHMENT_THRESHOLD_B)
+    changed = raw[:1000] + b"X" + raw[1001:]
+
+    # Adler-32 checksum (last 4 bytes) covers whole content.
+    old = compression.compress(raw)[1][:-4]
+    new = compression.compress(changed)[1][:-4]
+    common_suffix = next(i for i in range(1, len(old)) if old[-i] != new[-i]) - 1
+    assert common_suffix > len(old) // 2
+
+
+def test_incompressible_content_is_stored_as_is() -> None:
+    raw = random.Random(0).randbytes(10_000)
+    assert compression.compress(raw) == (compression.NO_COMPRESSION, raw)
+
+    png = b"\x89PNG" + text(10_000)
+    assert compression.compress(png) == (compression.NO_COMPRESSION, png)
+
+    assert compression.compress(b"") == (compression.NO_COMPRESSION, b"")
+
+
+def test_unknown_compression() -> None:
+    assert compression.decompress(compression.NO_COMPRESSION, b"abc") == b"abc"
+    assert compression.decompress("lzma", b"abc") is None
+
+
+def test_corrupted_data() -> None:
+    _, stored = compression.compress(text(10_000))
+    with pytest.raises(ValueError):
+        compression.decompress(compression.ZLIB, stored[:100])
+    with pytest.raises(ValueError):
+        compression.decompress(compression.ZLIB, b"not zlib")
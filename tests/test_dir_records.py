@@ -0,0 +1,27 @@
+from modules.filesystem.fs import FS_Dir
+from modules.filesystem import dir_records
+
+import pytest
+
+
+def test_round_trip_keeps_subdirectories_totals(tree: FS_Dir) -> None:
+    docs = tree.move_to("docs")
+    data = dir_records.dump(dir_records.snapshot(docs), [("empty", 41, (0, 0, 0)), ("sub", 42, (100, 3, 1))], 500)
+
+    root = FS_Dir("~", None)
+    dir = FS_Dir("docs", root, record=1, loaded=False)
+    dir.add_totals(999, 9, 9)  # As saved in parent's record.
+    dir_records.load(dir, data)
+
+    assert [file.repr() for file in dir.files] == [file.repr() for file in docs.files]
+    assert dir.quota == 500
+    sub = dir.move_to("sub")
+    assert (sub.record, sub.loaded) == (42, False)
+    assert (sub.total_size, sub.files_count, sub.dirs_count) == (100, 3, 1)
+    assert (dir.total_size, dir.files_count, dir.dirs_count) == (105, 5, 3)
+    assert (root.total_size, root.files_count, root.dirs_count) == (105, 5, 4)
+
+
+def test_invalid_record() -> None:
+    with pytest.raises(ValueError):
+        dir_records.load(FS_Dir("~", None, loaded=False), b"F:a:1:2:3|")
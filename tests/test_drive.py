@@ -0,0 +1,64 @@
+from modules.discord.data import DriveGuild
+from modules import errors
+
+import fakes
+import asyncio
+import os
+
+
+def data_channel(drive: DriveGuild) -> fakes.FakeChannel:
+    return drive.memory_manager.buckets[0].data_channels[0]
+
+
+def test_write_file_replaces_content(bot) -> None:
+    old, new = os.urandom(6000), os.urandom(6000)
+
+    async def main():
+        drive = await fakes.drive_guild(channels=1)
+        await drive.create_file(1, "a.bin", old)
+        old_messages = set(data_channel(drive).messages)
+
+        assert await drive.write_file(1, "a.bin", new) is True
+        return drive, old_messages, await drive.get_file_content(1, "a.bin")
+
+    drive, old_messages, content = asyncio.run(main())
+    assert content == new
+    assert not drive.locked_files
+    assert len(drive.memory_manager.chunk_pool) == len(old_messages)  # Old chunks are released after commit.
+
+
+def test_failed_write_keeps_old_content(bot) -> None:
+    old = os.urandom(6000)
+
+    async def main():
+        drive = await fakes.drive_guild(channels=1)
+        await drive.create_file(1, "a.bin", old)
+
+        # Second chunk of new content is not sent.
+        data_channel(drive).fail("send", after=1)
+        status = await drive.write_file(1, "a.bin", os.urandom(6000))
+        return drive, status, await drive.get_file_content(1, "a.bin")
+
+    drive, status, content = asyncio.run(main())
+    assert status == errors.SEND_FAILED
+    assert content == old
+    assert not drive.locked_files
+    assert not drive.memory_manager.free_space._reserved
+
+
+def test_failed_commit_frees_new_content(bot) -> None:
+    old = os.urandom(6000)
+
+    async def main():
+        drive = await fakes.drive_guild(channels=1)
+        await drive.create_file(1, "a.bin", old)
+        pooled = len(drive.memory_manager.chunk_pool)
+
+        drive.struct_channel.fail("send")
+        status = await drive.write_file(1, "a.bin", os.urandom(6000))
+        return drive, pooled, status, await drive.get_file_content(1, "a.bin")
+
+    drive, pooled, status, content = asyncio.run(main())
+    assert isinstance(status, errors.T_Error)
+    assert content == old  # Tree is read again from struct channel.
+    assert len(drive.memory_manager.chunk_pool) > pooled  # New chunks and manifest are freed.
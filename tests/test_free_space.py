@@ -0,0 +1,65 @@
+from modules.discord.data import MemoryManager, _ChunkIndex, _ChunkPool, _FreeSpaceIndex, _RecordPages
+from modules import limits
+
+from types import SimpleNamespace
+import asyncio
+
+
+def bucket(index: int, channels: dict[int, int]) -> SimpleNamespace:
+    """ Loaded bucket with channels (index -> used space), channel ids are index + 1000 * bucket index. """
+    data_channels = {i: SimpleNamespace(id=index * 1000 + i) for i in channels}
+    cache = {data_channels[i].id: used for i, used in channels.items()}
+    return SimpleNamespace(index=index, guild=SimpleNamespace(name="guild"), data_channels=data_channels, cache=cache)
+
+
+def test_first_fit_order() -> None:
+    space = _FreeSpaceIndex()
+    full = limits.TOTAL_CHANNEL_CONTENT_SIZE
+    space.add_bucket(bucket(1, {0: 0}))
+    space.add_bucket(bucket(0, {0: full, 1: full - 10}))
+
+    assert space.find(10) == 1
+    assert space.find(11) == limits.MAX_CHANNELS_PER_BUCKET
+
+    reservation = space.reserve(10)
+    assert reservation.channel.id == 1
+    assert space.find(10) == limits.MAX_CHANNELS_PER_BUCKET
+    space.release(reservation)
+    assert space.find(10) == 1
+
+
+def test_channels_out_of_limits_are_skipped() -> None:
+    space = _FreeSpaceIndex()
+    space.add_bucket(bucket(0, {0: limits.TOTAL_CHANNEL_CONTENT_SIZE, limits.MAX_CHANNELS_PER_BUCKET: 0}))
+    space.add_bucket(bucket(limits.MAX_BUCKETS, {0: 0}))
+
+    # Channel past the bucket's limit would take slot of first channel of bucket 1.
+    assert space.slot_of(limits.MAX_CHANNELS_PER_BUCKET) is None
+    assert space.slot_of(limits.MAX_BUCKETS * 1000) is None
+    assert space.find(1) is None
+
+
+class LazyBucket(SimpleNamespace):
+    """ Bucket joining free space index when loaded. """
+    is_loaded = False
+
+    async def load(self) -> None:
+        self.is_loaded = True
+        self._space.add_bucket(self)
+
+
+def test_reserve_loads_earlier_buckets_first() -> None:
+    full = limits.TOTAL_CHANNEL_CONTENT_SIZE
+    buckets = {index: LazyBucket(**vars(bucket(index, channels))) for index, channels in [(0, {0: full}), (1, {0: 0}), (2, {0: 0})]}
+    manager = MemoryManager(None, buckets, _ChunkIndex(_RecordPages(None)), _ChunkPool(_RecordPages(None)))
+    asyncio.run(buckets[2].load())
+
+    # Bucket 2 has space, but bucket 1 is checked first.
+    reservation = asyncio.run(manager.reserve_memory(10))
+    assert reservation.channel.id == 1000
+    assert [bucket.is_loaded for bucket in buckets.values()] == [True, True, True]
+
+    # Found channel is before bucket not loaded yet.
+    buckets[3] = LazyBucket(**vars(bucket(3, {0: 0})), _space=manager.free_space)
+    assert asyncio.run(manager.reserve_memory(10)).channel.id == 1000
+    assert not buckets[3].is_loaded
@@ -0,0 +1,74 @@
+from modules.filesystem.fs import FS_Dir, FS_File, MemoryAddress
+
+
+def file(name: str, parent: FS_Dir | None, size: int = 1) -> FS_File:
+    return FS_File(name, parent, MemoryAddress(1, 1), size)
+
+
+def test_cached_paths_follow_tree_changes() -> None:
+    root = FS_Dir("~", None)
+    docs = FS_Dir("docs", root)
+    a = file("a", docs)
+    assert (a.path_to(), a.is_linked(), a.base_dir()) == ("~/docs/a", True, root)
+
+    docs.rename("papers")
+    assert a.path_to() == "~/papers/a"
+
+    docs.remove()
+    assert (a.path_to(), a.is_linked(), a.base_dir()) == ("papers/a", False, docs)
+
+    root.insert_dir(docs)
+    assert (a.path_to(), a.is_linked(), a.base_dir()) == ("~/papers/a", True, root)
+
+
+def test_detached_subtree_is_cached_again_when_inserted() -> None:
+    root = FS_Dir("~", None)
+    new = FS_Dir("new", None)
+    a = file("a", new)
+    assert (a.path_to(), a.is_linked()) == ("new/a", False)
+
+    root.insert_dir(new)
+    assert (a.path_to(), a.is_linked()) == ("~/new/a", True)
+
+
+def test_generation_is_kept_per_tree() -> None:
+    first, second = FS_Dir("~", None), FS_Dir("~", None)
+    a = file("a", FS_Dir("docs", first))
+    b = file("b", second)
+    a.path_to(), b.path_to()
+
+    generation = second.generation
+    FS_Dir("other", first)
+    file("c", first).rename("d")
+    assert second.generation == generation
+    assert b._is_cached()
+
+
+def test_totals_follow_tree_changes() -> None:
+    root = FS_Dir("~", None)
+    docs = FS_Dir("docs", root)
+    sub = FS_Dir("sub", docs)
+    a = file("a", sub, 10)
+    file("b", docs, 5)
+    assert (root.total_size, root.files_count, root.dirs_count) == (15, 2, 2)
+
+    a.resize(100)
+    assert (sub.total_size, docs.total_size, root.total_size) == (100, 105, 105)
+
+    sub.remove()
+    assert (root.total_size, root.files_count, root.dirs_count) == (5, 1, 1)
+
+    root.insert_dir(sub)
+    assert (root.total_size, root.files_count, root.dirs_count) == (105, 2, 2)
+
+
+def test_over_quota_checks_parents() -> None:
+    root = FS_Dir("~", None)
+    docs = FS_Dir("docs", root, quota=100)
+    sub = FS_Dir("sub", docs)
+    file("a", sub, 60)
+    root.quota = 1000
+
+    assert sub.over_quota(40) is None
+    assert sub.over_quota(41) is docs
+    assert root.over_quota(941) is root
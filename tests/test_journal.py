@@ -0,0 +1,78 @@
+from modules.filesystem.fs import FS_Dir, MemoryAddress
+from modules.filesystem import journal
+
+import pytest
+
+
+def test_pack_and_unpack() -> None:
+    records = [journal.remove(f"~/dir{i}") for i in range(100)]
+    bodies = journal.pack(records, 200)
+    assert len(bodies) > 1
+    assert all(len(body) <= 200 for body in bodies)
+    assert [record for body in bodies for record in journal.unpack(body)] == records
+
+
+def test_records(tree: FS_Dir) -> None:
+    assert journal.make_dir("~/docs/sub/") == "D:~/docs/sub"
+    b = tree.move_to("docs/sub/deep/b.txt")
+    assert journal.put_file("~/docs/sub/deep/b.txt", b) == "F:~/docs/sub/deep/b.txt:2:11:6:b32k:zlib"
+    assert journal.remove("~/docs/") == "R:~/docs"
+    assert journal.rename("~/docs/", "new") == "N:~/docs:new"
+
+
+def test_apply_make_dir_and_put_file(tree: FS_Dir) -> None:
+    changed, removed = journal.apply(tree, journal.make_dir("~/docs/new/"))
+    assert changed is tree.move_to("docs") and removed is None
+
+    changed, _ = journal.apply(tree, "F:~/docs/new/f:2:20:7:b32k:zlib")
+    assert changed is tree.move_to("docs/new")
+
+    new_file = tree.move_to("docs/new/f")
+    assert new_file.mem_addr == MemoryAddress(2, 20)
+    assert (new_file.size, new_file.codec, new_file.compression) == (7, "b32k", "zlib")
+    assert (tree.total_size, tree.files_count, tree.dirs_count) == (10**10 + 18, 5, 5)
+
+
+def test_apply_updates_existing_file(tree: FS_Dir) -> None:
+    old = tree.move_to("docs/a.txt")
+    journal.apply(tree, "F:~/docs/a.txt:2:20:100:b64:none")
+    assert tree.move_to("docs/a.txt") is old
+    assert old.mem_addr == MemoryAddress(2, 20) and old.size == 100
+    assert tree.move_to("docs").total_size == 106
+
+
+def test_apply_rename_and_remove(tree: FS_Dir) -> None:
+    docs = tree.move_to("docs")
+    journal.apply(tree, journal.rename("~/docs", "papers"))
+    assert tree.move_to("papers") is docs and tree.move_to("docs") is None
+
+    changed, removed = journal.apply(tree, journal.remove("~/papers/"))
+    assert changed is tree and removed is docs
+    assert tree.move_to("papers") is None
+    assert (tree.total_size, tree.files_count, tree.dirs_count) == (10**10, 1, 0)
+
+
+def test_apply_set_quota(tree: FS_Dir) -> None:
+    record = journal.set_quota("~/docs/", 100)
+    assert record == "Q:~/docs:100"
+
+    changed, removed = journal.apply(tree, record)
+    assert changed is tree.move_to("docs") and removed is None
+    assert changed.quota == 100
+
+    journal.apply(tree, journal.set_quota("~/docs", None))
+    assert changed.quota is None
+
+
+@pytest.mark.parametrize("record", [
+    "D:~/docs",
+    "D:~/missing/dir",
+    "R:~/missing",
+    "F:~/docs:1:2:3:b64:none",
+    "X:~/docs",
+    "N:~/docs",
+    "Q:~/docs/a.txt:100",
+])
+def test_invalid_records(tree: FS_Dir, record: str) -> None:
+    with pytest.raises(ValueError):
+        journal.apply(tree, record)
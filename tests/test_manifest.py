@@ -0,0 +1,39 @@
+from modules.filesystem.fs import MemoryAddress
+from modules.filesystem import manifest
+
+import pytest
+
+
+def addresses(count: int) -> list[MemoryAddress]:
+    return [MemoryAddress(1000 + i // 7, 10**18 + i) for i in range(count)]
+
+
+def test_round_trip() -> None:
+    addrs = addresses(20)
+    bodies = manifest.pack(addrs)
+    assert len(bodies) == 1
+    assert manifest.is_manifest(bodies[0])
+    assert manifest.unpack(bodies[0]) == addrs
+
+
+def test_channel_is_written_only_when_changed() -> None:
+    body = manifest.pack([MemoryAddress(1, 10), MemoryAddress(1, 11), MemoryAddress(2, 12)])[0]
+    assert body == "#1:10,11,2:12"
+
+
+def test_bodies_are_split_and_read_independently() -> None:
+    addrs = addresses(500)
+    bodies = manifest.pack(addrs, 100)
+    assert len(bodies) > 1
+    assert all(len(body) <= 101 for body in bodies)
+    assert [addr for body in bodies for addr in manifest.unpack(body)] == addrs
+
+
+def test_empty_manifest() -> None:
+    assert manifest.pack([]) == ["#"]
+    assert manifest.unpack("#") == []
+
+
+def test_entry_without_channel() -> None:
+    with pytest.raises(ValueError):
+        manifest.unpack("#10,11")
@@ -0,0 +1,126 @@
+from modules.discord.data import MemoryManager, _alloc_size
+from modules.filesystem import codecs
+from modules import errors
+from modules import limits
+
+import fakes
+import asyncio
+
+
+def data_messages(manager: MemoryManager) -> list[fakes.FakeMessage]:
+    return [msg for bucket in manager.buckets.values() for ch in bucket.data_channels.values() for msg in ch.messages.values()]
+
+
+def test_store_chunks_deduplicates_stored_chunks(bot) -> None:
+    async def main():
+        guild, meta = await fakes.data_guild()
+        manager = await MemoryManager.init(guild, meta)
+        first = await manager.store_chunks(codecs.DEFAULT_CODEC, [b"a" * 100, b"b" * 100, b"a" * 100])
+        second = await manager.store_chunks(codecs.DEFAULT_CODEC, [b"b" * 100])
+        return manager, first, second
+
+    manager, first, second = asyncio.run(main())
+    assert first[0] == first[2] and second == [first[1]]
+    assert len(data_messages(manager)) == 2
+    assert manager.chunk_index.refs(first[0].message_id) == 2
+    assert manager.chunk_index.refs(first[1].message_id) == 2
+
+
+def test_store_chunks_rolls_back_failed_send(bot) -> None:
+    async def main():
+        guild, meta = await fakes.data_guild(channels=1)
+        manager = await MemoryManager.init(guild, meta)
+        stored = await manager.store_chunks(codecs.DEFAULT_CODEC, [b"a" * 100])
+
+        manager.buckets[0].data_channels[0].fail("send", after=1)
+        status = await manager.store_chunks(codecs.DEFAULT_CODEC, [b"a" * 100, b"b" * 100, b"c" * 100])
+        return manager, stored, status
+
+    manager, stored, status = asyncio.run(main())
+    assert status == errors.SEND_FAILED
+    assert manager.chunk_index.refs(stored[0].message_id) == 1  # Acquired reference is dropped.
+    assert len(manager.chunk_index.entries) == 1
+    assert not manager.free_space._reserved
+    assert len(manager.chunk_pool) == 1  # Sent chunk is freed.
+
+
+def channel_usage(manager: MemoryManager) -> int:
+    """ Memory used by data channel's messages as counted by bucket's cache. """
+    channel = manager.buckets[0].data_channels[0]
+    return sum(_alloc_size(msg) for msg in channel.messages.values())
+
+
+def test_freed_chunks_are_reused(bot) -> None:
+    async def main():
+        guild, meta = await fakes.data_guild(channels=1)
+        manager = await MemoryManager.init(guild, meta)
+        stored = await manager.store_chunks(codecs.DEFAULT_CODEC, [b"a" * 100, b"b" * 200])
+        await manager.release_chunks(stored)
+        pooled = len(manager.chunk_pool)
+
+        await manager.store_chunks(codecs.DEFAULT_CODEC, [b"c" * 300, b"d" * 50, b"e" * 10])
+        return manager, pooled
+
+    manager, pooled = asyncio.run(main())
+    channel = manager.buckets[0].data_channels[0]
+    assert pooled == 2
+    assert len(manager.chunk_pool) == 0
+    assert len(channel.messages) == 3  # Two pooled messages are edited, one is sent.
+    assert manager.buckets[0].cache[channel.id] == channel_usage(manager)
+
+
+def test_pooled_message_failures(bot) -> None:
+    async def main():
+        guild, meta = await fakes.data_guild(channels=1)
+        manager = await MemoryManager.init(guild, meta)
+        channel = manager.buckets[0].data_channels[0]
+        stored = await manager.store_chunks(codecs.DEFAULT_CODEC, [b"a" * 100, b"b" * 200])
+        await manager.release_chunks(stored)
+
+        # Removed pooled message is dropped, pooled message failing to edit is kept.
+        del channel.messages[stored[1].message_id]
+        channel.fail("edit")
+        status = await manager.store_chunks(codecs.DEFAULT_CODEC, [b"c" * 300])
+        return manager, stored, status
+
+    manager, stored, status = asyncio.run(main())
+    channel = manager.buckets[0].data_channels[0]
+    assert len(status) == 1 and status[0].message_id not in (stored[0].message_id, stored[1].message_id)
+    assert str(stored[0].message_id) in manager.chunk_pool.pages.records
+    assert manager.buckets[0].cache[channel.id] == channel_usage(manager)
+
+
+def test_buckets_are_loaded_on_first_use(bot) -> None:
+    async def main():
+        guild, meta = await fakes.data_guild(buckets=2, channels=1)
+        manager = await MemoryManager.init(guild, meta)
+        loaded = [bucket.is_loaded for bucket in manager.buckets.values()]
+
+        await manager.store_chunks(codecs.DEFAULT_CODEC, [b"a" * 100])
+        after_write = [bucket.is_loaded for bucket in manager.buckets.values()]
+        await manager.get_memory_usage()
+        return loaded, after_write, [bucket.is_loaded for bucket in manager.buckets.values()]
+
+    assert asyncio.run(main()) == ([False, False], [True, False], [True, True])
+
+
+def test_stored_size_of_attachments_is_saved(bot) -> None:
+    async def main():
+        guild, meta = await fakes.data_guild(channels=1)
+        manager = await MemoryManager.init(guild, meta)
+        await manager.store_chunks(codecs.ATTACHMENT_CODEC, [b"x" * 5000, b"y" * 3000])
+        await manager.store_chunks(codecs.DEFAULT_CODEC, [b"a" * 100])
+        usage = await manager.get_memory_usage()
+        await manager.flush()
+
+        # Cache is read from cache message (rebuilt one wouldn't count removed attachment).
+        channel = manager.buckets[0].data_channels[0]
+        channel.messages.pop(next(iter(channel.messages)))
+        reloaded = await MemoryManager.init(guild, meta)
+        return manager, usage, await reloaded.get_memory_usage(), reloaded.buckets[0].cache
+
+    manager, usage, reloaded_usage, reloaded_cache = asyncio.run(main())
+    text_size = _alloc_size(list(manager.buckets[0].data_channels[0].messages.values())[-1])
+    assert usage == reloaded_usage == {0: 8000 + text_size}
+    assert reloaded_cache == manager.buckets[0].cache
+    assert list(reloaded_cache.values()) == [2 * limits.MSG_SIZE + text_size]  # Attachments take single message slot.
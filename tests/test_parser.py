@@ -0,0 +1,25 @@
+from modules.filesystem.fs import FS_Dir
+from modules.filesystem.parser import Parser
+
+import pytest
+
+
+def test_export_round_trip(tree: FS_Dir) -> None:
+    parsed = Parser(tree.export()).parse()
+    assert parsed.export() == tree.export()
+    assert parsed.move_to("docs/sub/deep/b.txt").path_to() == "~/docs/sub/deep/b.txt"
+    assert (parsed.total_size, parsed.files_count, parsed.dirs_count) == (10**10 + 11, 4, 4)
+    assert parsed.move_to("docs/sub").parent_dir.name == "docs"
+
+
+def test_parse_bytes_and_legacy_entries() -> None:
+    parsed = Parser(b"D:~|F:a:1:10:5|D:d|F:b:1:11:6:b32k|?").parse()
+    a, b = parsed.move_to("a"), parsed.move_to("d/b")
+    assert (a.codec, a.compression) == ("b64", "none")
+    assert (b.codec, b.compression) == ("b32k", "none")
+
+
+@pytest.mark.parametrize("raw", ["", "X:~|", "D:~|F:a:1:10:5", "D:~|F:a:1:10:5|D:a|?"])
+def test_invalid_export(raw: str) -> None:
+    with pytest.raises(ValueError):
+        Parser(raw).parse()
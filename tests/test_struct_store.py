@@ -0,0 +1,102 @@
+from modules.discord.data import DriveGuild, _StructStore
+from modules.filesystem import fs
+from modules import limits
+
+import fakes
+import asyncio
+
+
+def kinds(drive: DriveGuild) -> list[str]:
+    """ Kinds of struct channel's messages (oldest first). """
+    return [msg.content.partition(fs.Tokens.SEP)[0] for msg in drive.struct_channel.messages.values()]
+
+
+async def reload(drive: DriveGuild) -> fs.FS_Dir:
+    """ Whole tree read again from struct channel. """
+    store, struct = await _StructStore.load(drive.struct_channel, set())
+    await store.load_subtree(struct)
+    return struct
+
+
+def test_journal_is_replayed_on_load(bot) -> None:
+    async def main():
+        drive = await fakes.drive_guild()
+        await drive.create_directory(1, "docs")  # Legacy tree is saved as records with first commit.
+        await drive.create_file(1, "docs/a.txt", "hello")
+        await drive.create_directory(1, "docs/sub")
+        await drive.create_directory(1, "tmp")
+        await drive.create_file(1, "tmp/x.txt", "x")
+        await drive.rename(1, "docs/a.txt", "b.txt")
+        await drive.set_quota(1, "docs", 1000)
+        await drive.delete_fs_obj(1, "tmp")
+        return drive, await reload(drive)
+
+    drive, loaded = asyncio.run(main())
+    assert kinds(drive)[-1] == _StructStore.JOURNAL
+    assert loaded.export() == drive._struct.export()
+    assert loaded.move_to("docs").quota == 1000
+    assert (loaded.total_size, loaded.files_count, loaded.dirs_count) == (5, 1, 2)
+
+
+def test_directories_are_read_on_demand(bot, tree: fs.FS_Dir) -> None:
+    async def main():
+        drive = await fakes.drive_guild(tree=tree)
+        await drive.create_directory(1, "new")  # Legacy tree is saved as records with first commit.
+
+        store, struct = await _StructStore.load(drive.struct_channel, set())
+        docs = struct.move_to("docs")
+        unread = (docs.loaded, docs.total_size, docs.files_count, len(docs.files))
+        return unread, await store.resolve(struct, "docs/sub/deep/b.txt"), docs
+
+    unread, file, docs = asyncio.run(main())
+    assert unread == (False, 11, 3, 0)  # Totals are known from parent's record.
+    assert file.path_to() == "~/docs/sub/deep/b.txt"
+    assert docs.loaded and not docs.move_to("empty").loaded
+    assert (docs.total_size, docs.files_count, docs.dirs_count) == (11, 3, 3)
+
+
+def test_checkpoint_rewrites_changed_records(bot, monkeypatch) -> None:
+    monkeypatch.setattr(limits, "STRUCT_JOURNAL_SIZE", 2)
+
+    async def main():
+        drive = await fakes.drive_guild()
+        await drive.create_directory(1, "docs")
+        first = kinds(drive)
+        await drive.create_directory(1, "other")
+        await drive.create_directory(1, "other/sub")
+        other_record = drive._struct.move_to("other").record
+
+        # Only docs and root are written again.
+        await drive.create_file(1, "docs/a.txt", "a")
+        await drive.create_file(1, "docs/b.txt", "b")
+        return drive, first, other_record, await reload(drive)
+
+    drive, first, other_record, loaded = asyncio.run(main())
+    assert first == [_StructStore.RECORD] * 2 + [_StructStore.CHECKPOINT]  # Legacy tree is removed.
+    assert kinds(drive) == [_StructStore.RECORD] * 4 + [_StructStore.CHECKPOINT]
+    assert drive._struct.move_to("other").record == other_record
+    assert loaded.export() == drive._struct.export()
+
+
+def test_failed_delete_is_retried_with_next_checkpoint(bot, monkeypatch) -> None:
+    monkeypatch.setattr(limits, "STRUCT_JOURNAL_SIZE", 2)
+
+    async def main():
+        drive = await fakes.drive_guild()
+        await drive.create_directory(1, "docs")
+
+        before = set(drive.struct_channel.messages)
+        drive.struct_channel.fail("delete")
+        await drive.create_file(1, "docs/a.txt", "a")
+        await drive.create_file(1, "docs/b.txt", "b")
+        left = before & set(drive.struct_channel.messages)
+        replaced = list(drive._struct_store._replaced)
+
+        await drive.create_file(1, "docs/c.txt", "c")
+        await drive.create_file(1, "docs/d.txt", "d")
+        return drive, left, replaced, before & set(drive.struct_channel.messages), await reload(drive)
+
+    drive, left, replaced, left_after, loaded = asyncio.run(main())
+    assert len(left) == 1 and left <= set(replaced)
+    assert not left_after
+    assert loaded.export() == drive._struct.export()